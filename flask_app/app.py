@@ -1,136 +1,103 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify
 import mlflow
 import pickle
 import os
 import pandas as pd
 import numpy as np
-from prometheus_client import Counter, Histogram, generate_latest, CollectorRegistry, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CollectorRegistry, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
 import time
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
-import string
-import re
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+import hashlib
+import tempfile
 import dagshub
 
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.text import normalize_text
+from src.model.linear_scorer import LinearScorer, MappedLinearScorer
+from src.features.vocabulary import load_vectorizer as load_mapped_vectorizer
+from model_cache import ModelCache
+from batcher import MicroBatcher
+
 import warnings
 warnings.simplefilter("ignore", UserWarning)
 warnings.filterwarnings("ignore")
 
-def lemmatization(text):
-    """Lemmatize the text."""
-    lemmatizer = WordNetLemmatizer()
-    text = text.split()
-    text = [lemmatizer.lemmatize(word) for word in text]
-    return " ".join(text)
-
-def remove_stop_words(text):
-    """Remove stop words from the text."""
-    stop_words = set(stopwords.words("english"))
-    text = [word for word in str(text).split() if word not in stop_words]
-    return " ".join(text)
-
-def removing_numbers(text):
-    """Remove numbers from the text."""
-    text = ''.join([char for char in text if not char.isdigit()])
-    return text
-
-def lower_case(text):
-    """Convert text to lower case."""
-    text = text.split()
-    text = [word.lower() for word in text]
-    return " ".join(text)
-
-def removing_punctuations(text):
-    """Remove punctuations from the text."""
-    text = re.sub('[%s]' % re.escape(string.punctuation), ' ', text)
-    text = text.replace('؛', "")
-    text = re.sub('\s+', ' ', text).strip()
-    return text
-
-def removing_urls(text):
-    """Remove URLs from the text."""
-    url_pattern = re.compile(r'https?://\S+|www\.\S+')
-    return url_pattern.sub(r'', text)
-
 def remove_small_sentences(df):
     """Remove sentences with less than 3 words."""
     for i in range(len(df)):
         if len(df.text.iloc[i].split()) < 3:
             df.text.iloc[i] = np.nan
 
-def normalize_text(text):
-    text = lower_case(text)
-    text = remove_stop_words(text)
-    text = removing_numbers(text)
-    text = removing_punctuations(text)
-    text = removing_urls(text)
-    text = lemmatization(text)
-
-    return text
-
 # MLflow and DagsHub setup
 # -------------------------------------------------------------------------------------
-try:
-    # Convert DAGSHUB_HTTP_TIMEOUT to integer if it exists
-    if os.environ.get("DAGSHUB_HTTP_TIMEOUT"):
-        try:
-            # Remove quotes if present
-            timeout_value = os.environ.get("DAGSHUB_HTTP_TIMEOUT").strip('"')
-            os.environ["DAGSHUB_HTTP_TIMEOUT"] = str(int(timeout_value))
-            print(f"Set DAGSHUB_HTTP_TIMEOUT to {os.environ['DAGSHUB_HTTP_TIMEOUT']}")
-        except ValueError:
-            print(f"Warning: DAGSHUB_HTTP_TIMEOUT value '{os.environ.get('DAGSHUB_HTTP_TIMEOUT')}' is not a valid integer. Using default.")
-            os.environ["DAGSHUB_HTTP_TIMEOUT"] = "30"
-
-    # Set up MLflow tracking URI
-    mlflow.set_tracking_uri('https://dagshub.com/jaggusuperhit/capstone.mlflow')
-    print("MLflow tracking URI set to: https://dagshub.com/jaggusuperhit/capstone.mlflow")
-
-    # Check for credentials in environment variables
-    username = os.environ.get("MLFLOW_TRACKING_USERNAME")
-    password = os.environ.get("MLFLOW_TRACKING_PASSWORD")
-
-    if username and password:
-        print("Found MLflow tracking credentials in environment variables")
-
-        # Try to initialize DagsHub
-        try:
-            # Set MLflow tracking username and password
-            os.environ["MLFLOW_TRACKING_USERNAME"] = username
-            os.environ["MLFLOW_TRACKING_PASSWORD"] = password
-
-            # Initialize DagsHub with explicit parameters
-            dagshub.init(
-                repo_owner='jaggusuperhit',
-                repo_name='capstone',
-                mlflow=True
-            )
-            print("DagsHub initialized successfully")
-        except Exception as e:
-            print(f"Warning: Failed to initialize DagsHub: {e}")
-            print("Continuing without DagsHub integration")
-    else:
-        # Try to use CAPSTONE_TEST as a fallback
-        dagshub_token = os.getenv("CAPSTONE_TEST")
-        if dagshub_token:
-            os.environ["MLFLOW_TRACKING_USERNAME"] = dagshub_token
-            os.environ["MLFLOW_TRACKING_PASSWORD"] = dagshub_token
-            print("DagsHub credentials set from CAPSTONE_TEST environment variable")
-
+def setup_mlflow_tracking():
+    """Point MLflow at DagsHub and initialize DagsHub when credentials are available."""
+    try:
+        # Convert DAGSHUB_HTTP_TIMEOUT to integer if it exists
+        if os.environ.get("DAGSHUB_HTTP_TIMEOUT"):
             try:
+                # Remove quotes if present
+                timeout_value = os.environ.get("DAGSHUB_HTTP_TIMEOUT").strip('"')
+                os.environ["DAGSHUB_HTTP_TIMEOUT"] = str(int(timeout_value))
+                print(f"Set DAGSHUB_HTTP_TIMEOUT to {os.environ['DAGSHUB_HTTP_TIMEOUT']}")
+            except ValueError:
+                print(f"Warning: DAGSHUB_HTTP_TIMEOUT value '{os.environ.get('DAGSHUB_HTTP_TIMEOUT')}' is not a valid integer. Using default.")
+                os.environ["DAGSHUB_HTTP_TIMEOUT"] = "30"
+
+        # Set up MLflow tracking URI
+        mlflow.set_tracking_uri('https://dagshub.com/jaggusuperhit/capstone.mlflow')
+        print("MLflow tracking URI set to: https://dagshub.com/jaggusuperhit/capstone.mlflow")
+
+        # Check for credentials in environment variables
+        username = os.environ.get("MLFLOW_TRACKING_USERNAME")
+        password = os.environ.get("MLFLOW_TRACKING_PASSWORD")
+
+        if username and password:
+            print("Found MLflow tracking credentials in environment variables")
+
+            # Try to initialize DagsHub
+            try:
+                # Set MLflow tracking username and password
+                os.environ["MLFLOW_TRACKING_USERNAME"] = username
+                os.environ["MLFLOW_TRACKING_PASSWORD"] = password
+
+                # Initialize DagsHub with explicit parameters
                 dagshub.init(
                     repo_owner='jaggusuperhit',
                     repo_name='capstone',
                     mlflow=True
                 )
-                print("DagsHub initialized successfully using CAPSTONE_TEST token")
+                print("DagsHub initialized successfully")
             except Exception as e:
-                print(f"Warning: Failed to initialize DagsHub with CAPSTONE_TEST token: {e}")
+                print(f"Warning: Failed to initialize DagsHub: {e}")
                 print("Continuing without DagsHub integration")
         else:
-            print("No DagsHub credentials found. Continuing without DagsHub integration.")
-except Exception as e:
-    print(f"Warning: Failed to set up MLflow tracking: {e}")
+            # Try to use CAPSTONE_TEST as a fallback
+            dagshub_token = os.getenv("CAPSTONE_TEST")
+            if dagshub_token:
+                os.environ["MLFLOW_TRACKING_USERNAME"] = dagshub_token
+                os.environ["MLFLOW_TRACKING_PASSWORD"] = dagshub_token
+                print("DagsHub credentials set from CAPSTONE_TEST environment variable")
+
+                try:
+                    dagshub.init(
+                        repo_owner='jaggusuperhit',
+                        repo_name='capstone',
+                        mlflow=True
+                    )
+                    print("DagsHub initialized successfully using CAPSTONE_TEST token")
+                except Exception as e:
+                    print(f"Warning: Failed to initialize DagsHub with CAPSTONE_TEST token: {e}")
+                    print("Continuing without DagsHub integration")
+            else:
+                print("No DagsHub credentials found. Continuing without DagsHub integration.")
+    except Exception as e:
+        print(f"Warning: Failed to set up MLflow tracking: {e}")
 # -------------------------------------------------------------------------------------
 
 
@@ -152,12 +119,81 @@ REQUEST_LATENCY = Histogram(
 PREDICTION_COUNT = Counter(
     "model_prediction_count", "Count of predictions for each class", ["prediction"], registry=registry
 )
+BATCH_SIZE = Histogram(
+    "app_batch_size", "Number of /predict requests scored together by the micro-batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256), registry=registry
+)
+BATCH_QUEUE_WAIT = Histogram(
+    "app_batch_queue_wait_seconds", "Time /predict requests waited in the micro-batching queue",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1), registry=registry
+)
+PREDICTION_CACHE_HITS = Counter(
+    "prediction_cache_hit_count", "Texts answered from the prediction cache", registry=registry
+)
+PREDICTION_CACHE_MISSES = Counter(
+    "prediction_cache_miss_count", "Texts not found in the prediction cache", registry=registry
+)
+PREDICTION_CACHE_EVICTIONS = Counter(
+    "prediction_cache_eviction_count", "Entries removed from the prediction cache", ["reason"], registry=registry
+)
+# Under gunicorn each worker serves its own model, so the version is reported per process
+MODEL_VERSION = Gauge(
+    "model_active_version", "Registry version of the model being served (0 when none)", ["model_name"],
+    registry=registry, multiprocess_mode="liveall"
+)
 
 # ------------------------------------------------------------------------------------------
 # Model and vectorizer setup
 model_name = "my_model"
-model = None
-vectorizer = None
+
+# Everything a prediction needs, replaced as a whole so a request never mixes a model
+# with another version's vectorizer. sparse_model is the underlying sklearn estimator
+# of the MLflow model, which scores CSR features without a DataFrame.
+ServingBundle = namedtuple("ServingBundle", ["model", "vectorizer", "sparse_model", "version"])
+serving = None
+
+# Upper bound on the number of texts accepted by the batch prediction endpoint
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "1000"))
+
+# "mlflow" serves the registry model; "scorer" serves the exported token-weight scorer;
+# "mmap" serves the same scorer from memory-mapped arrays shared by all worker processes
+SERVING_MODE = os.environ.get("SERVING_MODE", "mlflow")
+SCORER_PATH = os.environ.get("SCORER_PATH", "models/scorer.json")
+SCORER_MMAP_DIR = os.environ.get("SCORER_MMAP_DIR", "models/scorer_mmap")
+
+# "pickle" unpickles models/vectorizer.pkl; "mmap" maps the pickle-free vocabulary export
+VECTORIZER_FORMAT = os.environ.get("VECTORIZER_FORMAT", "pickle")
+VECTORIZER_MMAP_DIR = os.environ.get("VECTORIZER_MMAP_DIR", "models/vectorizer_vocab")
+# Run artifact directory holding the vectorizer.pkl and vectorizer_vocab/ a model was trained with
+VECTORIZER_ARTIFACT_PATH = "vectorizer"
+
+# Downloaded registry versions are kept here (possibly a volume shared by replicas);
+# set MODEL_CACHE_DIR to an empty string to always load straight from the registry
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "models/cache")
+MODEL_CACHE_MAX_BYTES = int(os.environ.get("MODEL_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+# "background" loads the model after startup while the fallback model answers,
+# "sync" loads it before the app is used, "off" only serves the fallback model
+MODEL_LOADING = os.environ.get("MODEL_LOADING", "background")
+# Set once loading has finished, successfully or not; reported by /ready
+model_ready = threading.Event()
+startup_time = time.time()
+
+# Seconds between registry checks for a newly promoted version; 0 disables hot reloading
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", "300"))
+# "on_load" starts the poller once loading has finished; "post_fork" leaves it to the
+# server's worker hook, since a thread started in a preloading master is not inherited
+MODEL_RELOAD_START = os.environ.get("MODEL_RELOAD_START", "on_load")
+model_reload_stop = threading.Event()
+
+# Coalesce concurrent single-text /predict calls into one vectorizer and model call
+MICRO_BATCHING = os.environ.get("MICRO_BATCHING", "off") == "on"
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get("MICRO_BATCH_MAX_WAIT_MS", "5"))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("MICRO_BATCH_MAX_SIZE", "64"))
+
+# Results for repeated texts; 0 entries disables the cache
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
 
 # Define a simple fallback model class that implements the predict method
 class FallbackSentimentModel:
@@ -188,18 +224,77 @@ class FallbackSentimentModel:
             # If input is already text
             text = ' '.join(X) if isinstance(X, list) else str(X)
 
+        return [self._predict_text(text)]
+
+    def predict_batch(self, texts):
+        """Predict sentiment for each text in a list, one label per text."""
+        return [self._predict_text(str(text)) for text in texts]
+
+    def _predict_text(self, text):
         # Convert to lowercase for matching
-        text = text.lower()
+        words = set(text.lower().split())
 
         # Count positive and negative words
-        positive_count = sum(1 for word in self.positive_words if word in text.split())
-        negative_count = sum(1 for word in self.negative_words if word in text.split())
+        positive_count = sum(1 for word in self.positive_words if word in words)
+        negative_count = sum(1 for word in self.negative_words if word in words)
 
         # Determine sentiment
         if positive_count > negative_count:
-            return [1]  # Positive
+            return 1  # Positive
         else:
-            return [0]  # Negative
+            return 0  # Negative
+
+class PredictionCache:
+    """Thread-safe LRU cache with a TTL for per-text prediction results.
+
+    Entries are keyed on a digest of the normalized text together with the serving
+    bundle's model version, and the whole cache is cleared when a new bundle is published.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(version, text):
+        return version, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                PREDICTION_CACHE_MISSES.inc()
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                PREDICTION_CACHE_EVICTIONS.labels(reason="ttl").inc()
+                PREDICTION_CACHE_MISSES.inc()
+                return None
+            self._entries.move_to_end(key)
+            PREDICTION_CACHE_HITS.inc()
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                PREDICTION_CACHE_EVICTIONS.labels(reason="size").inc()
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                PREDICTION_CACHE_EVICTIONS.labels(reason="model_change").inc(len(self._entries))
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL) if PREDICTION_CACHE_SIZE > 0 else None
 
 def get_latest_model_version(model_name):
     client = mlflow.MlflowClient()
@@ -208,49 +303,317 @@ def get_latest_model_version(model_name):
         latest_version = client.get_latest_versions(model_name, stages=["None"])
     return latest_version[0].version if latest_version else None
 
-# Try to load model from MLflow
-try:
-    model_version = get_latest_model_version(model_name)
-    if model_version:
-        model_uri = f'models:/{model_name}/{model_version}'
-        print(f"Fetching model from: {model_uri}")
-        model = mlflow.pyfunc.load_model(model_uri)
-        print("Model loaded successfully from MLflow")
+def get_raw_model(pyfunc_model):
+    """Return the underlying estimator of an MLflow pyfunc model, if it exposes one."""
+    try:
+        return pyfunc_model.get_raw_model()
+    except (AttributeError, NotImplementedError):
+        pass
+    impl = getattr(pyfunc_model, "_model_impl", None)
+    return getattr(impl, "sklearn_model", impl)
+
+def predict_texts(texts):
+    """Normalize and score a batch of texts with one vectorizer and one model call.
+
+    Texts found in the prediction cache are not scored again. Returns a tuple of
+    (predictions, probabilities, model_type). Probabilities are the positive class
+    scores, or None when the model does not expose predict_proba.
+    """
+    cleaned = [normalize_text(text) for text in texts]
+    # Read the bundle once; a concurrent reload does not affect this request
+    bundle = serving
+    if prediction_cache is None:
+        return score_texts(bundle, cleaned)
+
+    keys = [prediction_cache.key(bundle.version, text) for text in cleaned]
+    results = [prediction_cache.get(key) for key in keys]
+    misses = [i for i, result in enumerate(results) if result is None]
+
+    if misses:
+        predictions, probabilities, model_type = score_texts(bundle, [cleaned[i] for i in misses])
+        if probabilities is None:
+            probabilities = [None] * len(predictions)
+        for i, prediction, probability in zip(misses, predictions, probabilities):
+            results[i] = (prediction, probability, model_type)
+            # Results of a bundle replaced meanwhile must not outlive the cache clear
+            if bundle is serving:
+                prediction_cache.put(keys[i], results[i])
+
+    probabilities = [probability for _, probability, _ in results]
+    return (
+        [prediction for prediction, _, _ in results],
+        None if all(probability is None for probability in probabilities) else probabilities,
+        results[0][2],
+    )
+
+def score_texts(bundle, cleaned):
+    """Score normalized texts with a serving bundle, as (predictions, probabilities, model_type)."""
+    model, vectorizer, sparse_model, _ = bundle
+
+    if isinstance(model, FallbackSentimentModel):
+        # For fallback model, we can pass the text directly
+        return model.predict_batch(cleaned), None, "Fallback Keyword Model"
+
+    if isinstance(model, LinearScorer):
+        # A handful of dict lookups per text, no vectorizer or sklearn involved
+        predictions, probabilities = model.predict_batch(cleaned)
+        return predictions, probabilities, "Linear Scorer"
+
+    # For MLflow model, we need to convert to features
+    features = vectorizer.transform(cleaned)
+
+    probabilities = None
+    if sparse_model is not None:
+        # Hand the CSR matrix straight to the sklearn estimator, no densifying
+        predictions = sparse_model.predict(features).tolist()
+        if hasattr(sparse_model, "predict_proba"):
+            probabilities = sparse_model.predict_proba(features)[:, 1].tolist()
     else:
-        print(f"No versions of model '{model_name}' found in MLflow")
+        # Generic pyfunc models only accept a DataFrame
+        features_df = pd.DataFrame(features.toarray(), columns=[str(i) for i in range(features.shape[1])])
+        predictions = np.asarray(model.predict(features_df)).tolist()
+
+    return predictions, probabilities, "MLflow Model"
+
+def predict_each(texts):
+    """predict_texts for the micro-batcher: one (prediction, probability, model_type) per text."""
+    predictions, probabilities, model_type = predict_texts(texts)
+    if probabilities is None:
+        probabilities = [None] * len(predictions)
+    return [(prediction, probability, model_type) for prediction, probability in zip(predictions, probabilities)]
+
+batcher = MicroBatcher(
+    predict_each,
+    max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+    max_batch=MICRO_BATCH_MAX_SIZE,
+    batch_size_histogram=BATCH_SIZE,
+    queue_wait_histogram=BATCH_QUEUE_WAIT,
+) if MICRO_BATCHING else None
+
+def download_model_version(model_version, dst_dir):
+    """Download a registry version and the vectorizer logged with its training run into dst_dir.
+
+    The vectorizer ends up in dst_dir/vectorizer/; versions registered before it was logged
+    have none. Returns the directory holding the model, as ModelCache.fetch expects.
+    """
+    model_dir = mlflow.artifacts.download_artifacts(artifact_uri=f'models:/{model_name}/{model_version}',
+                                                    dst_path=dst_dir)
+    run_id = mlflow.MlflowClient().get_model_version(model_name, model_version).run_id
+    try:
+        mlflow.artifacts.download_artifacts(run_id=run_id, artifact_path=VECTORIZER_ARTIFACT_PATH, dst_path=dst_dir)
+    except Exception as e:
+        print(f"No vectorizer logged with version {model_version} (run {run_id}): {e}")
+    return model_dir
+
+def vectorizer_feature_count(vectorizer):
+    """Number of feature columns the vectorizer produces, or None if it cannot tell."""
+    if hasattr(vectorizer, "vocabulary_"):
+        return len(vectorizer.vocabulary_)
+    # MappedVectorizer and HashingVectorizer
+    return getattr(vectorizer, "n_features", None)
+
+def check_feature_count(vectorizer, estimator, model_version):
+    """Raise ValueError if the vectorizer's output does not have the width the model was trained on."""
+    expected = getattr(estimator, "n_features_in_", None)
+    actual = vectorizer_feature_count(vectorizer)
+    if expected is not None and actual is not None and expected != actual:
+        raise ValueError(f"the vectorizer produces {actual} features but version {model_version} "
+                         f"of '{model_name}' was trained on {expected}")
+
+def load_model(model_version=None, allow_local_vectorizer=True):
+    """Load the serving model and, if it needs one, its vectorizer, as a ServingBundle.
+
+    Uses the exported linear scorer when SERVING_MODE is "scorer" or "mmap", then the given (by
+    default the latest) MLflow registry version, and finally the keyword fallback model. Only
+    the MLflow model uses the vectorizer, so the scorers never load it.
+
+    The MLflow model is paired with the vectorizer logged in its own training run. Versions
+    without one use the local models/vectorizer.pkl if allow_local_vectorizer is set; a
+    vectorizer whose feature count differs from the model's is never paired with it.
+    """
+    # Try to load the exported linear scorer
+    if SERVING_MODE == "scorer":
+        try:
+            scorer = LinearScorer.load(SCORER_PATH)
+            print(f"Linear scorer with {len(scorer.weights)} weights loaded from {SCORER_PATH}")
+            return ServingBundle(scorer, None, None, None)
+        except Exception as e:
+            print(f"Error loading linear scorer from {SCORER_PATH}: {e}")
+            print("Falling back to the MLflow model")
+
+    # Try to map the exported linear scorer arrays
+    if SERVING_MODE == "mmap":
+        try:
+            scorer = MappedLinearScorer.load(SCORER_MMAP_DIR)
+            print(f"Memory-mapped linear scorer with {len(scorer.weights)} weights loaded from {SCORER_MMAP_DIR}")
+            return ServingBundle(scorer, None, None, None)
+        except Exception as e:
+            print(f"Error loading memory-mapped linear scorer from {SCORER_MMAP_DIR}: {e}")
+            print("Falling back to the MLflow model")
+
+    # Try to load model from MLflow
+    try:
+        if model_version is None:
+            model_version = get_latest_model_version(model_name)
+        if model_version:
+            print(f"Fetching model from: models:/{model_name}/{model_version}")
+            if MODEL_CACHE_DIR:
+                cache = ModelCache(MODEL_CACHE_DIR, MODEL_CACHE_MAX_BYTES)
+                model_dir = cache.fetch(model_name, model_version,
+                                        lambda dst_dir: download_model_version(model_version, dst_dir))
+            else:
+                model_dir = download_model_version(model_version,
+                                                   tempfile.mkdtemp(prefix=f"{model_name}-{model_version}-"))
+            mlflow_model = mlflow.pyfunc.load_model(model_dir)
+            print("Model loaded successfully from MLflow")
+
+            vectorizer_dir = os.path.join(model_dir, VECTORIZER_ARTIFACT_PATH)
+            if os.path.isdir(vectorizer_dir):
+                new_vectorizer = load_vectorizer(os.path.join(vectorizer_dir, "vectorizer.pkl"),
+                                                 os.path.join(vectorizer_dir, "vectorizer_vocab"), fallback=False)
+                print(f"Using the vectorizer logged with version {model_version}")
+            elif allow_local_vectorizer:
+                print(f"Version {model_version} has no logged vectorizer; using the local one")
+                new_vectorizer = load_vectorizer()
+            else:
+                raise ValueError(f"version {model_version} has no logged vectorizer, and the local one "
+                                 f"may belong to a different model")
+
+            raw_model = get_raw_model(mlflow_model)
+            check_feature_count(new_vectorizer, raw_model, model_version)
+            if hasattr(raw_model, "predict"):
+                print(f"Serving sparse features directly with {type(raw_model).__name__}")
+                return ServingBundle(mlflow_model, new_vectorizer, raw_model, model_version)
+            return ServingBundle(mlflow_model, new_vectorizer, None, model_version)
+        else:
+            print(f"No versions of model '{model_name}' found in MLflow")
+            print("Using fallback sentiment model instead")
+    except Exception as e:
+        print(f"Error loading model from MLflow: {e}")
         print("Using fallback sentiment model instead")
-        model = FallbackSentimentModel()
-except Exception as e:
-    print(f"Error loading model from MLflow: {e}")
-    print("Using fallback sentiment model instead")
-    model = FallbackSentimentModel()
-
-# Try to load vectorizer
-try:
-    vectorizer_path = 'models/vectorizer.pkl'
-    if os.path.exists(vectorizer_path):
-        vectorizer = pickle.load(open(vectorizer_path, 'rb'))
-        print(f"Vectorizer loaded successfully from {vectorizer_path}")
-    else:
+    return ServingBundle(FallbackSentimentModel(), None, None, None)
+
+def load_vectorizer(vectorizer_path='models/vectorizer.pkl', mmap_dir=None, fallback=True):
+    """Load the fitted vectorizer, or a small fallback vectorizer if it is missing.
+
+    With fallback=False a missing or unreadable vectorizer raises instead.
+    """
+    mmap_dir = mmap_dir or VECTORIZER_MMAP_DIR
+    # Try to map the exported vocabulary
+    if VECTORIZER_FORMAT == "mmap":
+        try:
+            loaded_vectorizer = load_mapped_vectorizer(mmap_dir)
+            print(f"Memory-mapped vectorizer loaded from {mmap_dir}")
+            return loaded_vectorizer
+        except Exception as e:
+            print(f"Error loading memory-mapped vectorizer from {mmap_dir}: {e}")
+            print("Falling back to the pickled vectorizer")
+
+    # Try to load vectorizer
+    try:
+        if os.path.exists(vectorizer_path):
+            with open(vectorizer_path, 'rb') as file:
+                loaded_vectorizer = pickle.load(file)
+            print(f"Vectorizer loaded successfully from {vectorizer_path}")
+            return loaded_vectorizer
         print(f"Vectorizer file not found at {vectorizer_path}")
-        # Create a simple fallback vectorizer
-        from sklearn.feature_extraction.text import CountVectorizer
-        print("Creating a simple fallback vectorizer")
-        vectorizer = CountVectorizer(max_features=1000)
-        # Fit on some sample text to initialize
-        vectorizer.fit(["This is a sample text to initialize the vectorizer"])
-except Exception as e:
-    print(f"Error loading vectorizer: {e}")
+    except Exception as e:
+        print(f"Error loading vectorizer: {e}")
+        if not fallback:
+            raise
+
+    if not fallback:
+        raise FileNotFoundError(f"Vectorizer file not found at {vectorizer_path}")
     # Create a simple fallback vectorizer
     from sklearn.feature_extraction.text import CountVectorizer
     print("Creating a simple fallback vectorizer")
-    vectorizer = CountVectorizer(max_features=1000)
+    fallback_vectorizer = CountVectorizer(max_features=1000)
     # Fit on some sample text to initialize
-    vectorizer.fit(["This is a sample text to initialize the vectorizer"])
+    fallback_vectorizer.fit(["This is a sample text to initialize the vectorizer"])
+    return fallback_vectorizer
+
+def validate_batch(payload):
+    """Check a batch prediction body, returning (texts, error message, HTTP status)."""
+    texts = payload.get("texts") if isinstance(payload, dict) else None
+
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+        return None, "Request body must be JSON with a non-empty 'texts' list of strings.", 400
+    if len(texts) > MAX_BATCH_SIZE:
+        return None, f"Batch size {len(texts)} exceeds the limit of {MAX_BATCH_SIZE}.", 413
+
+    # Check if a model is available
+    if serving.model is None:
+        return None, "Model or vectorizer not loaded. Please check server logs.", 503
+    return texts, None, 200
+
+def publish(bundle):
+    """Atomically replace the bundle used by new requests; in-flight requests keep the old one."""
+    global serving
+    serving = bundle
+    if prediction_cache is not None:
+        prediction_cache.clear()
+    MODEL_VERSION.labels(model_name=model_name).set(float(bundle.version or 0))
+
+def load_models():
+    """Set up MLflow tracking and load the model and vectorizer, replacing the fallback model."""
+    try:
+        setup_mlflow_tracking()
+        publish(load_model())
+    except Exception as e:
+        print(f"Error while loading models: {e}. Keeping the fallback model.")
+    finally:
+        model_ready.set()
+        print(f"Model loading finished in {time.time() - startup_time:.1f}s; serving {type(serving.model).__name__}")
+
+    if MODEL_RELOAD_START == "on_load":
+        start_model_reloader()
+
+def start_model_reloader():
+    """Start the background registry poller, if hot reloading applies to this serving mode."""
+    if SERVING_MODE == "mlflow" and MODEL_RELOAD_INTERVAL > 0 and MODEL_LOADING != "off":
+        threading.Thread(target=poll_model_version, name="model-reloader", daemon=True).start()
+
+def reload_model_if_changed():
+    """Load the latest registry version off the request path if it is not the one being served.
+
+    Returns True when a new model and vectorizer were published.
+    """
+    latest_version = get_latest_model_version(model_name)
+    if latest_version is None or latest_version == serving.version:
+        return False
+
+    print(f"Registry version of '{model_name}' changed from {serving.version} to {latest_version}, reloading")
+    # The vectorizer baked into this pod belongs to the model it was built with, not to a newer version
+    bundle = load_model(latest_version, allow_local_vectorizer=False)
+    if isinstance(bundle.model, FallbackSentimentModel):
+        print(f"Could not load version {latest_version}; keeping version {serving.version}")
+        return False
+
+    publish(bundle)
+    print(f"Now serving version {bundle.version} of '{model_name}'")
+    return True
+
+def poll_model_version():
+    """Check the registry every MODEL_RELOAD_INTERVAL seconds until model_reload_stop is set."""
+    while not model_reload_stop.wait(MODEL_RELOAD_INTERVAL):
+        try:
+            reload_model_if_changed()
+        except Exception as e:
+            print(f"Error while checking for a new model version: {e}")
+
+def start_model_loading():
+    """Load models according to MODEL_LOADING: in a background thread, inline, or not at all."""
+    if MODEL_LOADING == "background":
+        threading.Thread(target=load_models, name="model-loader", daemon=True).start()
+    elif MODEL_LOADING == "sync":
+        load_models()
+    else:
+        print("MODEL_LOADING=off, serving the fallback model only")
+        model_ready.set()
 
-# Check if model and vectorizer are loaded
-if model is None or vectorizer is None:
-    print("WARNING: Failed to create even fallback models. Prediction functionality will not work.")
+# The keyword model answers until the real model and vectorizer have been loaded
+publish(ServingBundle(FallbackSentimentModel(), None, None, None))
+start_model_loading()
 
 # Routes
 @app.route("/")
@@ -259,10 +622,13 @@ def home():
     start_time = time.time()
 
     # Check model status for informational purposes
-    if model is None or vectorizer is None:
+    model = serving.model
+    if model is None:
         model_status = "Not Available"
     elif isinstance(model, FallbackSentimentModel):
         model_status = "Using Fallback Keyword Model (MLflow model not found)"
+    elif isinstance(model, LinearScorer):
+        model_status = "Using Linear Scorer"
     else:
         model_status = "Using MLflow Model"
 
@@ -270,6 +636,15 @@ def home():
     REQUEST_LATENCY.labels(endpoint="/").observe(time.time() - start_time)
     return response
 
+def predict_text(text):
+    """Score a single text, through the micro-batcher when it is enabled."""
+    if batcher is not None:
+        prediction, _, model_type = batcher.submit(text)
+    else:
+        predictions, _, model_type = predict_texts([text])
+        prediction = predictions[0]
+    return prediction, model_type
+
 @app.route("/predict", methods=["POST"])
 def predict():
     REQUEST_COUNT.labels(method="POST", endpoint="/predict").inc()
@@ -277,31 +652,14 @@ def predict():
 
     text = request.form["text"]
 
-    # Check if model and vectorizer are available
-    if model is None or vectorizer is None:
+    # Check if a model is available
+    if serving.model is None:
         error_message = "Model or vectorizer not loaded. Please check server logs."
         REQUEST_LATENCY.labels(endpoint="/predict").observe(time.time() - start_time)
         return render_template("index.html", result=None, error=error_message)
 
     try:
-        # Clean text
-        text = normalize_text(text)
-
-        # Check if we're using the fallback model
-        is_fallback = isinstance(model, FallbackSentimentModel)
-
-        if is_fallback:
-            # For fallback model, we can pass the text directly
-            result = model.predict(text)
-            prediction = result[0]
-            model_type = "Fallback Keyword Model"
-        else:
-            # For MLflow model, we need to convert to features
-            features = vectorizer.transform([text])
-            features_df = pd.DataFrame(features.toarray(), columns=[str(i) for i in range(features.shape[1])])
-            result = model.predict(features_df)
-            prediction = result[0]
-            model_type = "MLflow Model"
+        prediction, model_type = predict_text(text)
 
         # Increment prediction count metric
         PREDICTION_COUNT.labels(prediction=str(prediction)).inc()
@@ -317,11 +675,58 @@ def predict():
         REQUEST_LATENCY.labels(endpoint="/predict").observe(time.time() - start_time)
         return render_template("index.html", result=None, error=error_message)
 
+@app.route("/api/v1/predict", methods=["POST"])
+def predict_batch():
+    """Score a JSON batch of texts: {"texts": ["...", ...]}."""
+    REQUEST_COUNT.labels(method="POST", endpoint="/api/v1/predict").inc()
+    start_time = time.time()
+
+    def respond(body, status):
+        REQUEST_LATENCY.labels(endpoint="/api/v1/predict").observe(time.time() - start_time)
+        return jsonify(body), status
+
+    texts, error, status = validate_batch(request.get_json(silent=True))
+    if error is not None:
+        return respond({"error": error}, status)
+
+    try:
+        predictions, probabilities, model_type = predict_texts(texts)
+
+        for prediction in predictions:
+            PREDICTION_COUNT.labels(prediction=str(prediction)).inc()
+
+        return respond({
+            "predictions": predictions,
+            "probabilities": probabilities,
+            "model_type": model_type,
+        }, 200)
+
+    except Exception as e:
+        error_message = f"Error during prediction: {str(e)}"
+        print(error_message)
+        return respond({"error": error_message}, 500)
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 once model loading has finished, 503 while it is in progress."""
+    model_type = type(serving.model).__name__
+    if not model_ready.is_set():
+        return jsonify({"status": "loading", "model_type": model_type, "model_version": serving.version}), 503
+    return jsonify({"status": "ready", "model_type": model_type, "model_version": serving.version}), 200
+
+def metrics_registry():
+    """The registry to expose: with PROMETHEUS_MULTIPROC_DIR set (gunicorn), the metrics of all workers."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        return collector_registry
+    return registry
+
 @app.route("/metrics", methods=["GET"])
 def metrics():
     """Expose only custom Prometheus metrics."""
-    return generate_latest(registry), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+    return generate_latest(metrics_registry()), 200, {"Content-Type": CONTENT_TYPE_LATEST}
 
 if __name__ == "__main__":
-    # app.run(debug=True) # for local use
-    app.run(debug=True, host="0.0.0.0", port=5000)  # Accessible from outside Docker
\ No newline at end of file
+    # Development server only; production uses gunicorn with flask_app/gunicorn.conf.py
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", host="0.0.0.0", port=int(os.environ.get("PORT", "5000")))
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+ASGI entry point with an async batch prediction endpoint.
+
+POST /api/v1/predict and the POST /predict form are served natively: text
+normalization and inference run in a bounded thread pool, and once ASYNC_MAX_PENDING
+requests are queued or running, new requests are rejected with 429 instead of piling
+up. All other routes are served by the Flask app from app.py.
+
+Run from the repository root:
+    uvicorn asgi:app --app-dir flask_app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+from flask import render_template
+from prometheus_client import Counter, Gauge
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse
+from starlette.routing import Mount, Route
+
+import app as flask_module
+
+# Threads running normalization and inference, and the most requests allowed to be
+# running or waiting for a thread before new ones get a 429
+ASYNC_WORKERS = int(os.environ.get("ASYNC_WORKERS", os.cpu_count() or 1))
+ASYNC_MAX_PENDING = int(os.environ.get("ASYNC_MAX_PENDING", str(ASYNC_WORKERS * 4)))
+
+PENDING_REQUESTS = Gauge(
+    "app_async_pending_requests", "Async prediction requests running or waiting for a worker thread",
+    registry=flask_module.registry, multiprocess_mode="livesum"
+)
+REJECTED_COUNT = Counter(
+    "app_rejected_request_count", "Requests rejected with 429 because the inference queue was full",
+    ["endpoint"], registry=flask_module.registry
+)
+
+executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="inference")
+# Only touched from the event loop, so no lock is needed
+pending = 0
+
+
+class QueueFull(Exception):
+    """Raised when ASYNC_MAX_PENDING requests are already running or waiting."""
+
+
+async def run_inference(endpoint, func, *args):
+    """Run func(*args) in the inference pool, or raise QueueFull if the pool is saturated."""
+    global pending
+    if pending >= ASYNC_MAX_PENDING:
+        REJECTED_COUNT.labels(endpoint=endpoint).inc()
+        raise QueueFull()
+
+    pending += 1
+    PENDING_REQUESTS.set(pending)
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, func, *args)
+    finally:
+        pending -= 1
+        PENDING_REQUESTS.set(pending)
+
+
+async def predict_batch(request):
+    """Score a JSON batch of texts: {"texts": ["...", ...]}, off the event loop."""
+    flask_module.REQUEST_COUNT.labels(method="POST", endpoint="/api/v1/predict").inc()
+    start_time = time.time()
+
+    def respond(body, status, headers=None):
+        flask_module.REQUEST_LATENCY.labels(endpoint="/api/v1/predict").observe(time.time() - start_time)
+        return JSONResponse(body, status_code=status, headers=headers)
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    texts, error, status = flask_module.validate_batch(payload)
+    if error is not None:
+        return respond({"error": error}, status)
+
+    try:
+        predictions, probabilities, model_type = await run_inference(
+            "/api/v1/predict", flask_module.predict_texts, texts
+        )
+    except QueueFull:
+        return respond({"error": "Too many requests in progress, retry later."}, 429, {"Retry-After": "1"})
+    except Exception as e:
+        error_message = f"Error during prediction: {str(e)}"
+        print(error_message)
+        return respond({"error": error_message}, 500)
+
+    for prediction in predictions:
+        flask_module.PREDICTION_COUNT.labels(prediction=str(prediction)).inc()
+
+    return respond({
+        "predictions": predictions,
+        "probabilities": probabilities,
+        "model_type": model_type,
+    }, 200)
+
+
+async def predict_form(request):
+    """Score the single text posted by the HTML form, through the same bounded pool."""
+    flask_module.REQUEST_COUNT.labels(method="POST", endpoint="/predict").inc()
+    start_time = time.time()
+
+    def respond(status=200, headers=None, **context):
+        with flask_module.app.app_context():
+            html = render_template("index.html", **context)
+        flask_module.REQUEST_LATENCY.labels(endpoint="/predict").observe(time.time() - start_time)
+        return HTMLResponse(html, status_code=status, headers=headers)
+
+    form = parse_qs((await request.body()).decode("utf-8", "replace"), keep_blank_values=True)
+    if "text" not in form:
+        return respond(400, result=None, error="Missing form field 'text'.")
+    text = form["text"][0]
+
+    # Check if a model is available
+    if flask_module.serving.model is None:
+        return respond(result=None, error="Model or vectorizer not loaded. Please check server logs.")
+
+    try:
+        prediction, model_type = await run_inference("/predict", flask_module.predict_text, text)
+    except QueueFull:
+        return respond(429, {"Retry-After": "1"}, result=None,
+                       error="Too many requests in progress, retry later.")
+    except Exception as e:
+        error_message = f"Error during prediction: {str(e)}"
+        print(error_message)
+        return respond(result=None, error=error_message)
+
+    flask_module.PREDICTION_COUNT.labels(prediction=str(prediction)).inc()
+    return respond(result=prediction, error=None, model_status=model_type)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    # Let running inference finish before the process exits
+    executor.shutdown(wait=True)
+
+
+app = Starlette(
+    routes=[
+        Route("/api/v1/predict", predict_batch, methods=["POST"]),
+        Route("/predict", predict_form, methods=["POST"]),
+        # Everything else (home page, /ready, /metrics) is handled by the Flask app
+        Mount("/", app=WSGIMiddleware(flask_module.app)),
+    ],
+    lifespan=lifespan,
+)
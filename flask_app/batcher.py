@@ -0,0 +1,84 @@
+"""
+Dynamic micro-batching for single-item requests.
+
+Requests handed to MicroBatcher.submit are queued, and a worker thread collects them for
+up to max_wait_ms or max_batch items, runs the batch function once over all of them and
+resolves each waiting request with its own result.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one call of a batch function."""
+
+    def __init__(self, batch_fn, max_wait_ms=5, max_batch=64, batch_size_histogram=None,
+                 queue_wait_histogram=None):
+        """
+        Args:
+            batch_fn (callable): Maps a list of items to a list of results in the same order.
+            max_wait_ms (float): How long the first request of a batch waits for more requests.
+            max_batch (int): Maximum number of items per batch.
+            batch_size_histogram: Optional Prometheus Histogram observing each batch size.
+            queue_wait_histogram: Optional Prometheus Histogram observing each request's
+                time in the queue before its batch started.
+        """
+        self.batch_fn = batch_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self.batch_size_histogram = batch_size_histogram
+        self.queue_wait_histogram = queue_wait_histogram
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def _ensure_worker(self):
+        # Started lazily so that forked server workers each get their own thread
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker.start()
+
+    def submit(self, item):
+        """Queue one item and block until its batch has been processed; returns its result."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or max_wait passes."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            if self.batch_size_histogram is not None:
+                self.batch_size_histogram.observe(len(batch))
+            if self.queue_wait_histogram is not None:
+                for _, _, enqueued in batch:
+                    self.queue_wait_histogram.observe(started - enqueued)
+
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,117 @@
+"""
+Gunicorn configuration for serving flask_app/app.py in production.
+
+Run from the repository root (model paths such as models/vectorizer.pkl are relative to it):
+    gunicorn --config flask_app/gunicorn.conf.py
+
+By default every worker binds right away and loads the model in a background thread,
+like the development server: the fallback model answers and /ready returns 503 until
+loading has finished. With MODEL_LOADING=sync the app is preloaded in the master, so
+the model and vectorizer are loaded once before fork and shared copy-on-write by all
+workers, at the cost of not accepting connections until the download has finished.
+Each worker uses a thread pool, so one slow request does not block the others.
+Prometheus metrics are aggregated over the workers through PROMETHEUS_MULTIPROC_DIR.
+"""
+import gc
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+# Workers write their Prometheus metrics to files in this directory, and /metrics in any
+# worker reports the sum over all of them. It must be set before prometheus_client is imported.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR",
+                                   os.path.join(tempfile.gettempdir(), "prometheus-gunicorn"))
+# Values left by an earlier run would be added to this one's; cleared here rather than in
+# on_starting because a preloaded app creates its metric files before that hook runs
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir)
+
+MODEL_LOADING = os.environ.get("MODEL_LOADING", "background")
+# Only a synchronous load can be shared through fork; a loader thread started in the
+# master would not be inherited by the workers
+preload_app = MODEL_LOADING == "sync"
+if preload_app:
+    # The registry poller is started in each worker instead, for the same reason
+    os.environ.setdefault("MODEL_RELOAD_START", "post_fork")
+
+wsgi_app = "app:app"
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+
+
+def available_cpus():
+    """
+    CPUs this container may use: the cgroup CPU quota if there is one, else the CPU affinity.
+
+    multiprocessing.cpu_count() reports the host's CPUs inside a container, and every worker
+    holds its own model, so sizing by it would multiply memory by the host's core count.
+    """
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as file:
+                quota = int(file.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as file:
+                period = int(file.read())
+            if quota > 0:
+                return max(1, math.ceil(quota / period))
+        except (OSError, ValueError):
+            pass
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+workers = int(os.environ.get("GUNICORN_WORKERS", available_cpus()))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+# Seconds a worker may spend on one request, and to finish in-flight requests on shutdown
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Move the preloaded objects out of the collector's reach, so that garbage collection
+    # in the workers does not touch (and copy) the pages shared with the master
+    gc.freeze()
+    server.log.info("Model preloaded; frozen %d objects before forking workers", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        # The worker imports the app itself, which starts loading and then the poller
+        return
+    # Threads do not survive fork; each worker polls the registry on its own
+    import app
+
+    app.start_model_reloader()
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of the dead worker; its counters and histograms keep counting
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    app = sys.modules.get("app")
+    if app is not None:
+        app.model_reload_stop.set()
@@ -0,0 +1,176 @@
+"""
+Local on-disk cache of MLflow model artifacts, keyed by registry model name and version.
+
+Each cached version lives in <cache_dir>/<model_name>/<version>/ next to a MANIFEST.json
+listing the SHA-256 checksum and size of every file. A version is only served from the
+cache when all checksums match; otherwise it is downloaded again. When the cache grows
+beyond max_bytes, the least recently used versions are evicted. Downloads of a version are
+serialized through <cache_dir>/<model_name>/<version>.lock, so processes that miss the
+cache at the same time download it once.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+MANIFEST_NAME = "MANIFEST.json"
+
+
+def _sha256(file_path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _build_manifest(directory):
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory)
+            if relative == MANIFEST_NAME:
+                continue
+            files[relative] = {"sha256": _sha256(path), "size": os.path.getsize(path)}
+    return {"files": files, "size": sum(entry["size"] for entry in files.values())}
+
+
+@contextlib.contextmanager
+def _file_lock(lock_path):
+    """Hold an exclusive lock on lock_path, shared by all processes using the cache directory."""
+    with open(lock_path, 'a+b') as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after about 10 seconds; keep waiting for the other download
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ModelCache:
+    """Size-bounded, checksum-validated cache of downloaded model versions."""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path_for(self, model_name, version):
+        return os.path.join(self.cache_dir, model_name, str(version))
+
+    def get(self, model_name, version):
+        """Return the local path of a valid cached version, or None."""
+        path = self.path_for(model_name, version)
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        try:
+            with open(manifest_path, 'r') as file:
+                manifest = json.load(file)
+            for relative, entry in manifest["files"].items():
+                if _sha256(os.path.join(path, relative)) != entry["sha256"]:
+                    raise ValueError(f"checksum mismatch for {relative}")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Discarding invalid cache entry {path}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        # The manifest mtime doubles as the last-used time for eviction
+        os.utime(manifest_path)
+        return path
+
+    def fetch(self, model_name, version, download):
+        """
+        Return the local path of a model version, downloading it on a cache miss.
+
+        Args:
+            model_name (str): Registered model name.
+            version (str): Registered model version.
+            download (callable): download(dst_dir) writes the model artifacts into dst_dir and
+                returns the directory it wrote them to, which must be dst_dir.
+        """
+        path = self.get(model_name, version)
+        if path is not None:
+            print(f"Model {model_name} version {version} loaded from cache {path}")
+            return path
+
+        path = self.path_for(model_name, version)
+        parent = os.path.dirname(path)
+        os.makedirs(parent, exist_ok=True)
+        with _file_lock(f"{path}.lock"):
+            # Another process may have downloaded the version while this one waited for the lock
+            if self.get(model_name, version) is not None:
+                print(f"Model {model_name} version {version} loaded from cache {path}")
+                return path
+
+            staging_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=parent)
+            try:
+                start_time = time.time()
+                downloaded = download(staging_dir)
+                if downloaded is None or not os.path.samefile(downloaded, staging_dir):
+                    raise RuntimeError(f"Model {model_name} version {version} was downloaded to {downloaded}, "
+                                       f"expected {staging_dir}")
+                with open(os.path.join(staging_dir, MANIFEST_NAME), 'w') as file:
+                    json.dump(_build_manifest(staging_dir), file)
+
+                # Rename into place atomically; a replica on another node sharing the volume may have won
+                try:
+                    os.rename(staging_dir, path)
+                except OSError:
+                    if self.get(model_name, version) is None:
+                        raise
+                print(f"Model {model_name} version {version} cached in {path} ({time.time() - start_time:.1f}s)")
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Remove least recently used versions until the cache fits in max_bytes."""
+        entries = []
+        for model_name in os.listdir(self.cache_dir):
+            model_dir = os.path.join(self.cache_dir, model_name)
+            if not os.path.isdir(model_dir):
+                continue
+            for version in os.listdir(model_dir):
+                manifest_path = os.path.join(model_dir, version, MANIFEST_NAME)
+                try:
+                    with open(manifest_path, 'r') as file:
+                        size = json.load(file)["size"]
+                    entries.append((os.path.getmtime(manifest_path), size, os.path.join(model_dir, version)))
+                except (OSError, ValueError, KeyError):
+                    continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+            print(f"Evicting cached model {path} ({size} bytes)")
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -1,48 +1,22 @@
-import numpy as np
-import pandas as pd
-import re
-import string
+import os
+import sys
 import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.text import normalize_text
 
 # Ensure stopwords and lemmatizer are downloaded
 nltk.download('stopwords')
 nltk.download('wordnet')
 
-# Load stop words once globally
-STOP_WORDS = set(stopwords.words("english"))
-LEMMATIZER = WordNetLemmatizer()
-
 def preprocess_text(text):
     """
-    Applies multiple text preprocessing steps:
-    - Lowercasing
-    - Removing stop words
-    - Removing numbers
-    - Removing punctuation
-    - Removing URLs
-    - Lemmatization
+    Applies the shared text normalization used by the training pipeline
+    (see src/text/normalization.py).
     """
-    if not isinstance(text, str):
-        return ""
-
-    # Lowercase and tokenize
-    words = text.lower().split()
-
-    # Remove stop words, numbers, and lemmatize
-    words = [
-        LEMMATIZER.lemmatize(re.sub(r'\d+', '', word))  # Remove numbers and lemmatize
-        for word in words if word not in STOP_WORDS
-    ]
-
-    # Remove punctuation
-    cleaned_text = ' '.join(words)
-    cleaned_text = re.sub(f"[{re.escape(string.punctuation)}]", " ", cleaned_text)
-    cleaned_text = re.sub(r"https?://\S+|www\.\S+", "", cleaned_text)  # Remove URLs
-    cleaned_text = re.sub(r"\s+", " ", cleaned_text).strip()  # Remove extra spaces
-
-    return cleaned_text
+    return normalize_text(text)
 
 def remove_small_sentences(df, column='text', min_words=3):
     """
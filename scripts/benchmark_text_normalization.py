@@ -0,0 +1,101 @@
+"""
+Microbenchmark for the shared text normalizer in src/text.
+
+Times the previous per-step implementations (as they existed in
+src/data/data_preprocessing.py and flask_app/app.py) against
+src.text.normalize_text on the reviews in data/raw/train.csv.
+
+Usage:
+    python scripts/benchmark_text_normalization.py [--data data/raw/train.csv] [--repeat 3]
+"""
+import argparse
+import os
+import re
+import string
+import sys
+import time
+
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.text import lemmatize, normalize_text
+
+
+def legacy_training_preprocess(text):
+    """Previous preprocess_text from src/data/data_preprocessing.py."""
+    lemmatizer = WordNetLemmatizer()
+    stop_words = set(stopwords.words("english"))
+
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = ''.join([char for char in text if not char.isdigit()])
+    text = text.lower()
+    text = re.sub('[%s]' % re.escape(string.punctuation), ' ', text)
+    text = text.replace('؛', "")
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = " ".join([word for word in text.split() if word not in stop_words])
+    text = " ".join([lemmatizer.lemmatize(word) for word in text.split()])
+    return text
+
+
+def legacy_serving_normalize(text):
+    """Previous normalize_text from flask_app/app.py."""
+    text = " ".join([word.lower() for word in text.split()])
+    stop_words = set(stopwords.words("english"))
+    text = " ".join([word for word in str(text).split() if word not in stop_words])
+    text = ''.join([char for char in text if not char.isdigit()])
+    text = re.sub('[%s]' % re.escape(string.punctuation), ' ', text)
+    text = text.replace('؛', "")
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.compile(r'https?://\S+|www\.\S+').sub(r'', text)
+    lemmatizer = WordNetLemmatizer()
+    text = " ".join([lemmatizer.lemmatize(word) for word in text.split()])
+    return text
+
+
+def time_normalizer(func, texts, repeat):
+    """Return the best wall time in seconds over `repeat` passes."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default='data/raw/train.csv')
+    parser.add_argument('--column', default='review')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.data)[args.column].astype(str).tolist()
+    print(f"Benchmarking {len(texts)} texts from {args.data} (best of {args.repeat})")
+
+    # Warm up the WordNet corpus so its lazy loading is not attributed to one side
+    normalize_text(texts[0])
+
+    baseline = time_normalizer(legacy_training_preprocess, texts, args.repeat)
+    results = {
+        'legacy training preprocess_text': baseline,
+        'legacy serving normalize_text': time_normalizer(legacy_serving_normalize, texts, args.repeat),
+        'src.text.normalize_text': time_normalizer(normalize_text, texts, args.repeat),
+    }
+
+    for name, seconds in results.items():
+        print(f"  {name:<34} {seconds:8.3f}s  {len(texts) / seconds:10.0f} texts/s  "
+              f"{baseline / seconds:6.1f}x")
+
+    print(f"Lemma cache after benchmarking: {lemmatize.cache_info()}")
+
+    matches = sum(legacy_training_preprocess(text) == normalize_text(text) for text in texts)
+    print(f"Output identical to the legacy training normalizer for {matches}/{len(texts)} texts")
+
+
+if __name__ == '__main__':
+    main()
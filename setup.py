@@ -16,7 +16,9 @@ setup(
     install_requires=[
         'numpy>=1.20.0',
         'pandas>=1.3.0',
+        'pyarrow>=10.0.0',
         'scikit-learn>=1.0.0',
+        'scipy>=1.7.0',
         'nltk>=3.8.1',
         'google-cloud-storage>=2.0.0',
         'google-auth>=2.0.0',
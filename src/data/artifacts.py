@@ -0,0 +1,214 @@
+# artifact formats for the files handed between DVC stages
+
+import os
+import shutil
+import struct
+import tempfile
+import zipfile
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# data/raw and data/interim hold text tables
+TEXT_FORMATS = ('csv', 'parquet')
+# data/processed holds feature matrices: dense with the label in the last column (csv, npy)
+# or scipy sparse with the labels in a separate file (npz)
+FEATURE_FORMATS = ('csv', 'npy', 'npz')
+
+
+def artifact_path(directory: str, name: str, fmt: str) -> str:
+    """Return the path of an artifact, using the format as the file extension."""
+    if fmt not in TEXT_FORMATS + FEATURE_FORMATS:
+        raise ValueError(f"Unsupported artifact format: {fmt}")
+    return os.path.join(directory, f"{name}.{fmt}")
+
+
+def read_table(file_path: str) -> pd.DataFrame:
+    """Read a CSV or Parquet table, chosen by file extension."""
+    if file_path.endswith('.parquet'):
+        return pd.read_parquet(file_path)
+    return pd.read_csv(file_path)
+
+
+def write_table(df: pd.DataFrame, file_path: str) -> None:
+    """Write a CSV or Parquet table, chosen by file extension."""
+    if file_path.endswith('.parquet'):
+        df.to_parquet(file_path, index=False)
+    else:
+        df.to_csv(file_path, index=False)
+
+
+def iter_table_chunks(file_path: str, chunksize: int):
+    """Yield a CSV or Parquet table as DataFrames of at most `chunksize` rows."""
+    if file_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(file_path, chunksize=chunksize)
+
+
+class TableWriter:
+    """Append DataFrame chunks to a single CSV or Parquet file."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._file = None
+        self._parquet_writer = None
+
+    def __enter__(self):
+        if not self.file_path.endswith('.parquet'):
+            self._file = open(self.file_path, 'w', newline='', encoding='utf-8')
+        return self
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._file is not None:
+            df.to_csv(self._file, header=(self._file.tell() == 0), index=False)
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self.file_path, table.schema)
+        self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._file is not None:
+            self._file.close()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def labels_path(file_path: str) -> str:
+    """Return the path of the label array stored next to a sparse .npz feature matrix."""
+    return os.path.splitext(file_path)[0] + '_labels.npy'
+
+
+def save_features(X, y, file_path: str) -> None:
+    """
+    Save a feature matrix and its labels.
+
+    .npz keeps X sparse (as an uncompressed archive) and writes y to a separate .npy file. CSV and .npy store a
+    dense matrix with the label appended as the last column.
+    """
+    if file_path.endswith('.npz'):
+        # Stored uncompressed so iter_feature_chunks can memory-map the CSR arrays in place
+        sparse.save_npz(file_path, sparse.csr_matrix(X), compressed=False)
+        np.save(labels_path(file_path), np.asarray(y))
+        return
+
+    dense = X.toarray() if sparse.issparse(X) else np.asarray(X)
+    data = np.column_stack([dense, np.asarray(y)])
+    if file_path.endswith('.npy'):
+        np.save(file_path, data)
+    else:
+        df = pd.DataFrame(data)
+        df.columns = list(range(dense.shape[1])) + ['label']
+        df.to_csv(file_path, index=False)
+
+
+def load_features(file_path: str) -> tuple:
+    """Load a feature matrix saved by save_features as (X, y). Sparse files stay sparse."""
+    if file_path.endswith('.npz'):
+        return sparse.load_npz(file_path).tocsr(), np.load(labels_path(file_path))
+
+    if file_path.endswith('.npy'):
+        data = np.load(file_path)
+    else:
+        data = pd.read_csv(file_path).values
+    return data[:, :-1], data[:, -1]
+
+
+def load_labels(file_path: str) -> np.ndarray:
+    """Load only the labels of a feature file saved by save_features."""
+    if file_path.endswith('.npz'):
+        return np.load(labels_path(file_path))
+    if file_path.endswith('.npy'):
+        return np.asarray(np.load(file_path, mmap_mode='r')[:, -1])
+    return pd.read_csv(file_path, usecols=['label'])['label'].values
+
+
+def _map_npz_member(archive: zipfile.ZipFile, file_path: str, name: str, get_workdir) -> np.ndarray:
+    """
+    Memory-map one array of an .npz archive.
+
+    Uncompressed members are mapped where they are in the archive. Compressed members
+    (archives written by earlier versions) are first streamed to a .npy file in the
+    directory returned by `get_workdir()`.
+    """
+    info = archive.getinfo(name)
+    if info.compress_type != zipfile.ZIP_STORED:
+        target = os.path.join(get_workdir(), name)
+        with archive.open(info) as source, open(target, 'wb') as out:
+            shutil.copyfileobj(source, out, 2 ** 16)
+        return np.load(target, mmap_mode='r')
+
+    with open(file_path, 'rb') as file:
+        # Local file header: 30 fixed bytes, then the file name and the extra field
+        file.seek(info.header_offset)
+        local_header = file.read(30)
+        name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+        file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(file)
+        read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                       else np.lib.format.read_array_header_2_0)
+        shape, fortran_order, dtype = read_header(file)
+        offset = file.tell()
+    if dtype.hasobject:
+        raise ValueError(f"Cannot memory-map the object array {name} of {file_path}")
+    return np.memmap(file_path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def iter_feature_chunks(file_path: str, chunksize: int):
+    """
+    Yield a feature file saved by save_features as (X, y) chunks of at most `chunksize` rows.
+
+    CSV is read chunk by chunk and .npy is memory-mapped, so only one chunk is held in
+    memory. For .npz the data, indices and indptr arrays of the CSR matrix are
+    memory-mapped and each chunk is built from its slice of them, so the full matrix is
+    never loaded.
+    """
+    if file_path.endswith('.npz'):
+        y = np.load(labels_path(file_path), mmap_mode='r')
+        workdir = None
+
+        def get_workdir():
+            # Created in the system temp directory, not next to the DVC output, and only
+            # when a compressed member has to be extracted
+            nonlocal workdir
+            if workdir is None:
+                workdir = tempfile.mkdtemp(prefix='npz-members-')
+            return workdir
+
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                matrix_format = np.load(archive.open('format.npy')).item()
+                if matrix_format not in (b'csr', 'csr'):
+                    raise ValueError(f"{file_path} holds a {matrix_format!r} matrix, expected csr")
+                n_rows, n_columns = np.load(archive.open('shape.npy'))
+                data, indices, indptr = (_map_npz_member(archive, file_path, name, get_workdir)
+                                         for name in ('data.npy', 'indices.npy', 'indptr.npy'))
+            for start in range(0, n_rows, chunksize):
+                stop = min(start + chunksize, n_rows)
+                first, last = indptr[start], indptr[stop]
+                X = sparse.csr_matrix((np.array(data[first:last]), np.array(indices[first:last]),
+                                       np.array(indptr[start:stop + 1]) - first), shape=(stop - start, n_columns))
+                yield X, np.array(y[start:stop])
+        finally:
+            # Release the maps before removing their files (required on Windows)
+            data = indices = indptr = None
+            if workdir is not None:
+                shutil.rmtree(workdir, ignore_errors=True)
+    elif file_path.endswith('.npy'):
+        data = np.load(file_path, mmap_mode='r')
+        for start in range(0, data.shape[0], chunksize):
+            chunk = np.asarray(data[start:start + chunksize])
+            yield chunk[:, :-1], chunk[:, -1]
+    else:
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            values = chunk.values
+            yield values[:, :-1], values[:, -1]
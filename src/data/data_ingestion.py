@@ -12,6 +12,8 @@ import logging
 # Add the project root directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from src.data.artifacts import artifact_path, write_table
+
 # Now import from src
 try:
     from src.logger import logging
@@ -88,13 +90,13 @@ def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
         logging.error('Unexpected error during preprocessing: %s', e)
         raise
 
-def save_data(train_data: pd.DataFrame, test_data: pd.DataFrame, data_path: str) -> None:
-    """Save the train and test datasets."""
+def save_data(train_data: pd.DataFrame, test_data: pd.DataFrame, data_path: str, fmt: str = 'csv') -> None:
+    """Save the train and test datasets as CSV or Parquet."""
     try:
         raw_data_path = os.path.join(data_path, 'raw')
         os.makedirs(raw_data_path, exist_ok=True)
-        train_data.to_csv(os.path.join(raw_data_path, "train.csv"), index=False)
-        test_data.to_csv(os.path.join(raw_data_path, "test.csv"), index=False)
+        write_table(train_data, artifact_path(raw_data_path, "train", fmt))
+        write_table(test_data, artifact_path(raw_data_path, "test", fmt))
         logging.debug('Train and test data saved to %s', raw_data_path)
     except Exception as e:
         logging.error('Unexpected error occurred while saving the data: %s', e)
@@ -108,10 +110,11 @@ def main():
         try:
             params = load_params(params_path='params.yaml')
             test_size = params['data_ingestion']['test_size']
-            print(f"Using test_size={test_size} from params.yaml")
+            text_format = params.get('artifacts', {}).get('text_format', 'csv')
+            print(f"Using test_size={test_size}, text_format={text_format} from params.yaml")
         except Exception as e:
-            print(f"Failed to load parameters: {e}. Using default test_size=0.2")
-            test_size = 0.2
+            print(f"Failed to load parameters: {e}. Using default test_size=0.2, text_format=csv")
+            test_size, text_format = 0.2, 'csv'
 
         # Try to load data from GCP if credentials are available
         try:
@@ -152,7 +155,7 @@ def main():
         print(f"Train data shape: {train_data.shape}, Test data shape: {test_data.shape}")
 
         print("Saving data...")
-        save_data(train_data, test_data, data_path='./data')
+        save_data(train_data, test_data, data_path='./data', fmt=text_format)
 
         # Upload processed data to GCP if credentials are available
         try:
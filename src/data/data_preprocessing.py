@@ -1,18 +1,20 @@
 # data preprocessing
 
 import numpy as np
-import pandas as pd
 import os
 import sys
-import re
+import time
 import nltk
-import string
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import yaml
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 # Add the project root directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from src.data.artifacts import TableWriter, artifact_path, iter_table_chunks, read_table, write_table
+from src.text import NormalizedTextCache, lemmatize, normalize_text
+
 # Now import from src
 try:
     from src.logger import logging
@@ -31,6 +33,23 @@ except ImportError:
 nltk.download('wordnet', quiet=True)
 nltk.download('stopwords', quiet=True)
 
+def load_params(params_path: str) -> dict:
+    """Load parameters from a YAML file."""
+    try:
+        with open(params_path, 'r') as file:
+            params = yaml.safe_load(file)
+        logging.debug('Parameters retrieved from %s', params_path)
+        return params
+    except FileNotFoundError:
+        logging.error('File not found: %s', params_path)
+        raise
+    except yaml.YAMLError as e:
+        logging.error('YAML error: %s', e)
+        raise
+    except Exception as e:
+        logging.error('Unexpected error: %s', e)
+        raise
+
 def preprocess_text(text):
     """
     Preprocess a single text string.
@@ -41,25 +60,7 @@ def preprocess_text(text):
     Returns:
         str: The preprocessed text.
     """
-    # Initialize lemmatizer and stopwords
-    lemmatizer = WordNetLemmatizer()
-    stop_words = set(stopwords.words("english"))
-
-    # Remove URLs
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    # Remove numbers
-    text = ''.join([char for char in text if not char.isdigit()])
-    # Convert to lowercase
-    text = text.lower()
-    # Remove punctuations
-    text = re.sub('[%s]' % re.escape(string.punctuation), ' ', text)
-    text = text.replace('؛', "")
-    text = re.sub(r'\s+', ' ', text).strip()  # Fixed invalid escape sequence
-    # Remove stop words
-    text = " ".join([word for word in text.split() if word not in stop_words])
-    # Lemmatization
-    text = " ".join([lemmatizer.lemmatize(word) for word in text.split()])
-    return text
+    return normalize_text(text)
 
 def preprocess_data(df):
     """
@@ -80,22 +81,92 @@ def preprocess_data(df):
 
     return processed_df
 
-def preprocess_dataframe(df, col='text'):
+def _preprocess_chunk(texts):
+    """Preprocess one shard of texts inside a worker process and time it."""
+    start_time = time.perf_counter()
+    processed = [preprocess_text(text) for text in texts]
+    return os.getpid(), processed, time.perf_counter() - start_time
+
+def _resolve_n_jobs(n_jobs):
+    """Translate the n_jobs parameter into a number of worker processes."""
+    return os.cpu_count() if n_jobs in (None, -1) else n_jobs
+
+def parallel_preprocess(texts, n_jobs=-1, chunksize=10000, executor=None):
+    """
+    Preprocess texts on a process pool, one chunk of `chunksize` texts per task.
+
+    Args:
+        texts (list): The raw texts.
+        n_jobs (int): Number of worker processes, -1 for all CPUs.
+        chunksize (int): Number of texts per task.
+        executor (ProcessPoolExecutor): Pool to reuse across calls. A new one is
+            created and shut down when not given.
+
+    Returns:
+        list: The preprocessed texts, in the same order as the input.
+    """
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=min(_resolve_n_jobs(n_jobs), len(chunks))) as executor:
+            return parallel_preprocess(texts, n_jobs, chunksize, executor)
+
+    processed = []
+    worker_stats = defaultdict(lambda: [0, 0.0])
+    # executor.map yields results in submission order, so the output is deterministic
+    for pid, chunk_result, elapsed in executor.map(_preprocess_chunk, chunks):
+        processed.extend(chunk_result)
+        worker_stats[pid][0] += len(chunk_result)
+        worker_stats[pid][1] += elapsed
+
+    for pid, (rows, seconds) in sorted(worker_stats.items()):
+        logging.info('Worker %d: %d rows in %.2fs (%.0f rows/sec)', pid, rows, seconds, rows / max(seconds, 1e-9))
+    return processed
+
+def normalize_texts(texts, n_jobs=1, chunksize=10000, executor=None):
+    """Normalize a list of texts in-process, or on a process pool when it spans several chunks."""
+    if n_jobs == 1 or len(texts) <= chunksize:
+        processed = [preprocess_text(text) for text in texts]
+        logging.info('Lemma cache: %s', lemmatize.cache_info())
+        return processed
+    return parallel_preprocess(texts, n_jobs, chunksize, executor)
+
+def preprocess_dataframe(df, col='text', n_jobs=1, chunksize=10000, executor=None, copy=True, cache=None):
     """
     Preprocess a DataFrame by applying text preprocessing to a specific column.
 
     Args:
         df (pd.DataFrame): The DataFrame to preprocess.
         col (str): The name of the column containing text.
+        n_jobs (int): Number of worker processes, -1 for all CPUs. 1 runs in-process.
+        chunksize (int): Number of rows per worker task.
+        executor (ProcessPoolExecutor): Optional pool shared across calls.
+        copy (bool): Work on a copy instead of modifying `df` in place.
+        cache (NormalizedTextCache): Optional persistent cache; only texts missing from it
+            are normalized, and their results are added to it.
 
     Returns:
         pd.DataFrame: The preprocessed DataFrame.
     """
     # Make a copy of the DataFrame
-    df = df.copy()
+    if copy:
+        df = df.copy()
 
     # Apply preprocessing to the specified column
-    df[col] = df[col].apply(preprocess_text)
+    start_time = time.perf_counter()
+    texts = df[col].tolist()
+    if cache is None:
+        df[col] = normalize_texts(texts, n_jobs, chunksize, executor)
+    else:
+        processed = cache.get_many(texts)
+        # Each distinct uncached text is normalized once
+        missing = list(dict.fromkeys(text for text, result in zip(texts, processed) if result is None))
+        normalized = dict(zip(missing, normalize_texts(missing, n_jobs, chunksize, executor)))
+        cache.put_many(normalized.items())
+        df[col] = [normalized[text] if result is None else result for text, result in zip(texts, processed)]
+        logging.info('Normalized text cache: %d of %d rows cached (%d texts normalized)',
+                     len(texts) - sum(result is None for result in processed), len(texts), len(missing))
+    elapsed = time.perf_counter() - start_time
+    logging.info('Preprocessed %d rows in %.2fs (%.0f rows/sec)', len(df), elapsed, len(df) / max(elapsed, 1e-9))
 
     # Remove small sentences (less than 3 words)
     # df[col] = df[col].apply(lambda x: np.nan if len(str(x).split()) < 3 else x)
@@ -105,15 +176,103 @@ def preprocess_dataframe(df, col='text'):
     logging.info("Data pre-processing completed")
     return df
 
+def preprocess_file(input_path, output_path, col='review', read_chunksize=100000, n_jobs=1, chunksize=10000,
+                    cache=None):
+    """
+    Stream a CSV or Parquet file through preprocess_dataframe, appending each chunk to the output.
+
+    Only `read_chunksize` rows are held in memory at a time, so peak memory depends on
+    the chunk size rather than the size of the dataset.
+
+    Args:
+        input_path (str): The raw CSV or Parquet file.
+        output_path (str): The CSV or Parquet file to write.
+        col (str): The name of the column containing text.
+        read_chunksize (int): Number of rows read from the input per chunk.
+        n_jobs (int): Number of worker processes, -1 for all CPUs. 1 runs in-process.
+        chunksize (int): Number of rows per worker task.
+        cache (NormalizedTextCache): Optional persistent cache of normalized texts.
+
+    Returns:
+        int: The number of rows written.
+    """
+    executor = None
+    if n_jobs != 1 and read_chunksize > chunksize:
+        executor = ProcessPoolExecutor(max_workers=_resolve_n_jobs(n_jobs))
+
+    rows_written = 0
+    try:
+        with TableWriter(output_path) as writer:
+            for i, chunk in enumerate(iter_table_chunks(input_path, read_chunksize)):
+                processed = preprocess_dataframe(chunk, col, n_jobs, chunksize, executor, copy=False, cache=cache)
+                writer.write(processed)
+                rows_written += len(processed)
+                logging.info('Chunk %d: %d rows appended to %s', i, len(processed), output_path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    logging.info('Streamed %d rows from %s to %s', rows_written, input_path, output_path)
+    return rows_written
+
+def report_cache(cache):
+    """Print the hit rate of the normalized text cache, evict down to its size limit and close it."""
+    if cache is None:
+        return
+    print(f"Normalized text cache: {cache.hits} hits, {cache.misses} misses, hit rate {cache.hit_rate():.1%}")
+    evicted = cache.evict()
+    print(f"Cache size {cache.size() / 2 ** 20:.1f} MiB after evicting {evicted} entries")
+    cache.close()
 
 def main():
     try:
         print("Starting data preprocessing...")
 
+        # Load parameters
+        try:
+            all_params = load_params('params.yaml')
+            params = all_params['data_preprocessing']
+            n_jobs = params.get('n_jobs', 1)
+            chunksize = params.get('chunksize', 10000)
+            stream = params.get('stream', False)
+            read_chunksize = params.get('read_chunksize', 100000)
+            use_cache = params.get('cache', False)
+            cache_path = params.get('cache_path', 'cache/normalized_text.sqlite')
+            cache_max_mb = params.get('cache_max_mb', 512)
+            text_format = all_params.get('artifacts', {}).get('text_format', 'csv')
+            print(f"Using n_jobs={n_jobs}, chunksize={chunksize}, stream={stream}, "
+                  f"text_format={text_format} from params.yaml")
+        except Exception as e:
+            print(f"Failed to load parameters: {e}. Using default n_jobs=1, chunksize=10000, stream=False")
+            n_jobs, chunksize, stream, read_chunksize, text_format = 1, 10000, False, 100000, 'csv'
+            use_cache, cache_path, cache_max_mb = False, 'cache/normalized_text.sqlite', 512
+
+        cache = None
+        if use_cache:
+            cache = NormalizedTextCache(cache_path, cache_max_mb * 1024 * 1024)
+            print(f"Using normalized text cache {cache_path} (version {cache.version})")
+
+        data_path = os.path.join("./data", "interim")
+
+        if stream:
+            # Read, normalize and append chunk by chunk so memory stays flat
+            os.makedirs(data_path, exist_ok=True)
+            for split in ('train', 'test'):
+                print(f"\nStreaming {split} data in chunks of {read_chunksize} rows...")
+                rows = preprocess_file(artifact_path('./data/raw', split, text_format),
+                                       artifact_path(data_path, f'{split}_processed', text_format),
+                                       'review', read_chunksize, n_jobs, chunksize, cache)
+                print(f"Processed {split} rows: {rows}")
+            report_cache(cache)
+
+            print(f"Processed data saved to {data_path}")
+            print("Data preprocessing completed successfully!")
+            return
+
         # Fetch the data from data/raw
         print("Loading data from data/raw...")
-        train_data = pd.read_csv('./data/raw/train.csv')
-        test_data = pd.read_csv('./data/raw/test.csv')
+        train_data = read_table(artifact_path('./data/raw', 'train', text_format))
+        test_data = read_table(artifact_path('./data/raw', 'test', text_format))
         logging.info('Data loaded properly')
         print(f"Train data shape: {train_data.shape}, Test data shape: {test_data.shape}")
 
@@ -123,9 +282,10 @@ def main():
 
         # Transform the data
         print("\nPreprocessing train data...")
-        train_processed_data = preprocess_dataframe(train_data, 'review')
+        train_processed_data = preprocess_dataframe(train_data, 'review', n_jobs, chunksize, cache=cache)
         print("\nPreprocessing test data...")
-        test_processed_data = preprocess_dataframe(test_data, 'review')
+        test_processed_data = preprocess_dataframe(test_data, 'review', n_jobs, chunksize, cache=cache)
+        report_cache(cache)
 
         print("\nSample train data after preprocessing:")
         print(train_processed_data.head(2))
@@ -135,11 +295,10 @@ def main():
 
         # Store the data inside data/interim
         print("\nSaving processed data...")
-        data_path = os.path.join("./data", "interim")
         os.makedirs(data_path, exist_ok=True)
 
-        train_processed_data.to_csv(os.path.join(data_path, "train_processed.csv"), index=False)
-        test_processed_data.to_csv(os.path.join(data_path, "test_processed.csv"), index=False)
+        write_table(train_processed_data, artifact_path(data_path, "train_processed", text_format))
+        write_table(test_processed_data, artifact_path(data_path, "test_processed", text_format))
 
         logging.info('Processed data saved to %s', data_path)
         print(f"Processed data saved to {data_path}")
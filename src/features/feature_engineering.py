@@ -3,13 +3,17 @@ import numpy as np
 import pandas as pd
 import os
 import sys
-from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer, TfidfVectorizer
 import yaml
 import pickle
 
 # Add the project root directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from src.data.artifacts import artifact_path, read_table, save_features
+from src.features.incremental import TermCountCache, incremental_transform, text_hash
+from src.features.vocabulary import export_vectorizer
+
 # Now import from src
 try:
     from src.logger import logging
@@ -43,9 +47,9 @@ def load_params(params_path: str) -> dict:
         raise
 
 def load_data(file_path: str) -> pd.DataFrame:
-    """Load data from a CSV file."""
+    """Load data from a CSV or Parquet file."""
     try:
-        df = pd.read_csv(file_path)
+        df = read_table(file_path)
         df.fillna('', inplace=True)
         logging.info('Data loaded and NaNs filled from %s', file_path)
         return df
@@ -56,41 +60,86 @@ def load_data(file_path: str) -> pd.DataFrame:
         logging.error('Unexpected error occurred while loading the data: %s', e)
         raise
 
-def apply_bow(train_data: pd.DataFrame, test_data: pd.DataFrame, max_features: int) -> tuple:
-    """Apply Count Vectorizer to the data."""
+def build_vectorizer(method: str = 'bow', max_features: int = None, n_features: int = 2 ** 20,
+                     ngram_range: tuple = (1, 1), min_df=1, max_df=1.0):
+    """
+    Create the text vectorizer for the configured feature extraction method.
+
+    Args:
+        method (str): 'bow' for raw counts over a fitted vocabulary, 'tfidf' for TF-IDF
+            weights over a fitted vocabulary, or 'hashing' for a stateless
+            HashingVectorizer with constant memory and no vocabulary.
+        max_features (int): Vocabulary size cap for 'bow' and 'tfidf'.
+        n_features (int): Number of hash buckets for 'hashing'.
+        ngram_range (tuple): Lower and upper n-gram sizes.
+        min_df (int or float): Drop terms found in fewer documents ('bow' and 'tfidf').
+        max_df (int or float): Drop terms found in more documents ('bow' and 'tfidf').
+    """
+    ngram_range = tuple(ngram_range)
+    if method == 'bow':
+        return CountVectorizer(max_features=max_features, ngram_range=ngram_range, min_df=min_df, max_df=max_df)
+    if method == 'tfidf':
+        return TfidfVectorizer(max_features=max_features, ngram_range=ngram_range, min_df=min_df, max_df=max_df)
+    if method == 'hashing':
+        # Non-negative raw counts, matching what CountVectorizer produces
+        return HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm=None)
+    raise ValueError(f"Unsupported feature_engineering.method: {method}")
+
+def apply_bow(train_data: pd.DataFrame, test_data: pd.DataFrame, max_features: int,
+              method: str = 'bow', n_features: int = 2 ** 20, ngram_range: tuple = (1, 1),
+              min_df=1, max_df=1.0, incremental: bool = False, cache_dir: str = 'cache/features') -> tuple:
+    """
+    Apply Count Vectorizer (or the TF-IDF / hashing vectorizer) to the data.
+
+    With `incremental`, bow and tfidf features are built from per-row term counts cached
+    in `cache_dir`, so only new or changed texts are tokenized.
+
+    Returns:
+        tuple: ((X_train, y_train), (X_test, y_test)) with X as scipy CSR matrices.
+    """
     try:
-        logging.info("Applying BOW...")
-        vectorizer = CountVectorizer(max_features=max_features)
+        logging.info("Applying BOW with method=%s, ngram_range=%s...", method, ngram_range)
+        vectorizer = build_vectorizer(method, max_features, n_features, ngram_range, min_df, max_df)
 
         X_train = train_data['review'].values
         y_train = train_data['sentiment'].values
         X_test = test_data['review'].values
         y_test = test_data['sentiment'].values
 
-        X_train_bow = vectorizer.fit_transform(X_train)
-        X_test_bow = vectorizer.transform(X_test)
-
-        train_df = pd.DataFrame(X_train_bow.toarray())
-        train_df['label'] = y_train
-
-        test_df = pd.DataFrame(X_test_bow.toarray())
-        test_df['label'] = y_test
-
-        # Create models directory if it doesn't exist
+        if incremental and method != 'hashing':
+            cache = TermCountCache(cache_dir, vectorizer)
+            X_train_bow, X_test_bow = incremental_transform(vectorizer, X_train, X_test, cache)
+            # Keep only the rows of the current splits, so the cache does not grow without bound
+            cache.save(keep_keys=[text_hash(text) for text in list(X_train) + list(X_test)],
+                       vocabulary=vectorizer.vocabulary_)
+        else:
+            # HashingVectorizer has nothing to fit, so fit_transform is a plain transform
+            X_train_bow = vectorizer.fit_transform(X_train)
+            X_test_bow = vectorizer.transform(X_test)
+
+        # The terms pruned by max_features/min_df/max_df are only kept for introspection
+        # and can outweigh the vocabulary itself, so keep them out of the serving pickle
+        if hasattr(vectorizer, 'stop_words_'):
+            del vectorizer.stop_words_
+
+        # Create models directory if it doesn't exist. For hashing this pickles only the
+        # constructor parameters, so serving has no vocabulary to load.
         os.makedirs('models', exist_ok=True)
         pickle.dump(vectorizer, open('models/vectorizer.pkl', 'wb'))
+        # Pickle-free copy whose vocabulary serving can memory-map
+        export_vectorizer(vectorizer, 'models/vectorizer_vocab')
         logging.info('Bag of Words applied and data transformed')
 
-        return train_df, test_df
+        return (X_train_bow, y_train), (X_test_bow, y_test)
     except Exception as e:
         logging.error('Error during Bag of Words transformation: %s', e)
         raise
 
-def save_data(df: pd.DataFrame, file_path: str) -> None:
-    """Save the dataframe to a CSV file."""
+def save_data(X, y, file_path: str) -> None:
+    """Save a feature matrix and its labels as sparse .npz, .npy or CSV."""
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        df.to_csv(file_path, index=False)
+        save_features(X, y, file_path)
         logging.info('Data saved to %s', file_path)
     except Exception as e:
         logging.error('Unexpected error occurred while saving the data: %s', e)
@@ -105,15 +154,25 @@ def main():
         try:
             params = load_params('params.yaml')
             max_features = params['feature_engineering']['max_features']
-            print(f"Using max_features={max_features} from params.yaml")
+            method = params['feature_engineering'].get('method', 'bow')
+            n_features = params['feature_engineering'].get('n_features', 2 ** 20)
+            ngram_range = tuple(params['feature_engineering'].get('ngram_range', (1, 1)))
+            min_df = params['feature_engineering'].get('min_df', 1)
+            max_df = params['feature_engineering'].get('max_df', 1.0)
+            incremental = params['feature_engineering'].get('incremental', False)
+            text_format = params.get('artifacts', {}).get('text_format', 'csv')
+            features_format = params.get('artifacts', {}).get('features_format', 'csv')
+            print(f"Using method={method}, max_features={max_features}, n_features={n_features}, "
+                  f"ngram_range={ngram_range}, min_df={min_df}, max_df={max_df} from params.yaml")
         except Exception as e:
-            print(f"Failed to load parameters: {e}. Using default max_features=20")
-            max_features = 20
+            print(f"Failed to load parameters: {e}. Using default method=bow, max_features=20")
+            max_features, method, n_features, text_format, features_format = 20, 'bow', 2 ** 20, 'csv', 'csv'
+            ngram_range, min_df, max_df, incremental = (1, 1), 1, 1.0, False
 
         # Load data
         print("\nLoading processed data...")
-        train_data = load_data('./data/interim/train_processed.csv')
-        test_data = load_data('./data/interim/test_processed.csv')
+        train_data = load_data(artifact_path('./data/interim', 'train_processed', text_format))
+        test_data = load_data(artifact_path('./data/interim', 'test_processed', text_format))
         print(f"Train data shape: {train_data.shape}, Test data shape: {test_data.shape}")
 
         # Display sample data
@@ -122,17 +181,15 @@ def main():
 
         # Apply Bag of Words
         print("\nApplying Bag of Words transformation...")
-        train_df, test_df = apply_bow(train_data, test_data, max_features)
-        print(f"Train BOW shape: {train_df.shape}, Test BOW shape: {test_df.shape}")
-
-        # Display sample transformed data
-        print("\nSample transformed train data:")
-        print(train_df.head(2))
+        (X_train, y_train), (X_test, y_test) = apply_bow(
+            train_data, test_data, max_features, method, n_features, ngram_range, min_df, max_df, incremental)
+        print(f"Train BOW shape: {X_train.shape}, Test BOW shape: {X_test.shape}")
+        print(f"Non-zero entries: train {X_train.nnz}, test {X_test.nnz}")
 
         # Save data
         print("\nSaving transformed data...")
-        save_data(train_df, os.path.join("./data", "processed", "train_bow.csv"))
-        save_data(test_df, os.path.join("./data", "processed", "test_bow.csv"))
+        save_data(X_train, y_train, artifact_path(os.path.join("./data", "processed"), "train_bow", features_format))
+        save_data(X_test, y_test, artifact_path(os.path.join("./data", "processed"), "test_bow", features_format))
 
         print("Feature engineering process completed successfully!")
     except Exception as e:
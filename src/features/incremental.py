@@ -0,0 +1,233 @@
+# incremental feature engineering over a cache of per-row term counts
+
+import hashlib
+import json
+import os
+import sys
+from numbers import Integral
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+# Now import from src
+try:
+    from src.logger import logging
+except ImportError:
+    # If the above import fails, set up basic logging
+    import logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+# Settings that change which terms a text produces; a cache is only valid for one of them
+ANALYZER_PARAMS = ('analyzer', 'lowercase', 'token_pattern', 'ngram_range', 'stop_words', 'strip_accents')
+
+
+def text_hash(text: str) -> str:
+    """Content hash of a normalized text, used as the cache key of its row."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class TermCountCache:
+    """
+    Per-row term counts of normalized texts, keyed by a content hash.
+
+    Counts are stored over an append-only index of every term seen so far (not just the
+    fitted vocabulary), so the rows stay valid when max_features, min_df or max_df select
+    a different vocabulary. The cache lives in a directory:
+        meta.json   analyzer settings and the term of each column
+        rows.npz    CSR matrix of the cached rows over those columns
+        hashes.json the text hash of each row of rows.npz
+    """
+
+    def __init__(self, directory: str, vectorizer):
+        self.directory = directory
+        self.analyzer_params = {key: value for key, value in vectorizer.get_params().items()
+                                if key in ANALYZER_PARAMS}
+        self.analyzer_params['ngram_range'] = list(self.analyzer_params['ngram_range'])
+        self._analyzer = vectorizer.build_analyzer()
+        self.terms, self.term_index = [], {}
+        self.rows, self.row_index = sparse.csr_matrix((0, 0), dtype=np.int64), {}
+        self.hits = self.misses = 0
+        self.vocabulary_digest = None
+        self._load()
+
+    def _load(self):
+        meta_path = os.path.join(self.directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, 'r') as file:
+            meta = json.load(file)
+        if meta['analyzer_params'] != self.analyzer_params:
+            logging.info('Analyzer settings changed; ignoring the cached term counts in %s', self.directory)
+            return
+        with open(os.path.join(self.directory, 'hashes.json'), 'r') as file:
+            hashes = json.load(file)
+        self.terms = meta['terms']
+        self.vocabulary_digest = meta.get('vocabulary_digest')
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        self.rows = sparse.load_npz(os.path.join(self.directory, 'rows.npz')).tocsr()
+        self.row_index = {key: i for i, key in enumerate(hashes)}
+        logging.info('Loaded %d cached rows over %d terms from %s', len(hashes), len(self.terms), self.directory)
+
+    def count(self, texts) -> sparse.csr_matrix:
+        """
+        Return the term counts of `texts` over the cached term columns.
+
+        Rows found in the cache are reused; only new or changed texts are analyzed, and
+        they are added to the cache.
+        """
+        keys = [text_hash(text) for text in texts]
+        new = {}
+        for text, key in zip(texts, keys):
+            if key in self.row_index or key in new:
+                continue
+            counts = {}
+            for term in self._analyzer(text):
+                column = self.term_index.get(term)
+                if column is None:
+                    column = self.term_index[term] = len(self.terms)
+                    self.terms.append(term)
+                counts[column] = counts.get(column, 0) + 1
+            new[key] = counts
+        self.misses += len(new)
+        self.hits += len(keys) - len(new)
+
+        n_terms = len(self.terms)
+        if new:
+            indptr, indices, values = [0], [], []
+            for counts in new.values():
+                indices.extend(counts.keys())
+                values.extend(counts.values())
+                indptr.append(len(indices))
+            new_rows = sparse.csr_matrix((np.asarray(values, dtype=np.int64), indices, indptr),
+                                         shape=(len(new), n_terms))
+            old_rows = self.rows.copy()
+            old_rows.resize((self.rows.shape[0], n_terms))
+            for key in new:
+                self.row_index[key] = len(self.row_index)
+            self.rows = sparse.vstack([old_rows, new_rows], format='csr')
+        elif self.rows.shape[1] != n_terms:
+            self.rows.resize((self.rows.shape[0], n_terms))
+
+        X = self.rows[[self.row_index[key] for key in keys]]
+        X.sort_indices()
+        return X
+
+    def save(self, keep_keys=None, vocabulary=None) -> None:
+        """Write the cache, keeping only the rows of `keep_keys` (all rows if None).
+
+        A digest of the fitted `vocabulary` is stored so the next run can report whether it changed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if keep_keys is None:
+            keys, rows = list(self.row_index), self.rows
+        else:
+            keys = [key for key in dict.fromkeys(keep_keys) if key in self.row_index]
+            rows = self.rows[[self.row_index[key] for key in keys]]
+            # Drop the terms that only occurred in discarded rows
+            used = np.unique(rows.indices)
+            rows = rows[:, used]
+            self.terms = [self.terms[i] for i in used]
+        sparse.save_npz(os.path.join(self.directory, 'rows.npz'), rows)
+        with open(os.path.join(self.directory, 'hashes.json'), 'w') as file:
+            json.dump(keys, file)
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as file:
+            json.dump({'analyzer_params': self.analyzer_params, 'terms': self.terms,
+                       'vocabulary_digest': vocabulary_digest(vocabulary) if vocabulary else None}, file)
+        logging.info('Saved %d cached rows to %s', len(keys), self.directory)
+
+
+def vocabulary_digest(vocabulary: dict) -> str:
+    """Content hash of a fitted vocabulary, independent of dict order."""
+    return text_hash(json.dumps(sorted((term, int(column)) for term, column in vocabulary.items())))
+
+
+def select_vocabulary(X_counts, terms: list, vectorizer) -> tuple:
+    """
+    Choose the vocabulary the way CountVectorizer.fit does, from cached training counts.
+
+    Returns:
+        tuple: (vocabulary dict of term -> column, array of the matching cache columns).
+    """
+    if vectorizer.binary:
+        X_counts = X_counts.copy()
+        X_counts.data.fill(1)
+
+    # Terms of the training rows, in the alphabetical order CountVectorizer sorts them into
+    present = np.flatnonzero(np.diff(X_counts.tocsc().indptr))
+    present = present[np.argsort([terms[i] for i in present], kind='stable')]
+    X = X_counts[:, present]
+
+    n_doc = X.shape[0]
+    max_df, min_df, max_features = vectorizer.max_df, vectorizer.min_df, vectorizer.max_features
+    max_doc_count = max_df if isinstance(max_df, Integral) else max_df * n_doc
+    min_doc_count = min_df if isinstance(min_df, Integral) else min_df * n_doc
+    if max_doc_count < min_doc_count:
+        raise ValueError("max_df corresponds to < documents than min_df")
+
+    # Same pruning as CountVectorizer._limit_features, including its tie-breaking
+    dfs = np.diff(X.tocsc().indptr)
+    mask = (dfs <= max_doc_count) & (dfs >= min_doc_count)
+    if max_features is not None and mask.sum() > max_features:
+        tfs = np.asarray(X.sum(axis=0)).ravel()
+        mask_inds = (-tfs[mask]).argsort()[:max_features]
+        new_mask = np.zeros(len(dfs), dtype=bool)
+        new_mask[np.where(mask)[0][mask_inds]] = True
+        mask = new_mask
+    if not mask.any():
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+    columns = present[mask]
+    return {terms[i]: column for column, i in enumerate(columns)}, columns
+
+
+def incremental_transform(vectorizer, train_texts, test_texts, cache: TermCountCache) -> tuple:
+    """
+    Fit a CountVectorizer or TfidfVectorizer from cached term counts and transform both splits.
+
+    Only texts missing from the cache are analyzed; the output matrices are column
+    selections of the cached rows. The vectorizer ends up fitted exactly as fit_transform
+    on `train_texts` would leave it, so it can be pickled for serving. TF-IDF needs
+    use_idf=True (the default).
+
+    Returns:
+        tuple: (X_train, X_test) as CSR matrices.
+    """
+    if getattr(vectorizer, 'use_idf', True) is False:
+        # Without IDF weights there is no public way to hand a fitted transformer to the vectorizer
+        raise ValueError("Incremental TF-IDF features require use_idf=True")
+
+    train_counts = cache.count(train_texts)
+    test_counts = cache.count(test_texts)
+
+    vocabulary, columns = select_vocabulary(train_counts, cache.terms, vectorizer)
+    X_train = train_counts[:, columns].astype(vectorizer.dtype)
+    X_test = test_counts[:, columns].astype(vectorizer.dtype)
+    if vectorizer.binary:
+        X_train.data.fill(1)
+        X_test.data.fill(1)
+
+    vectorizer.vocabulary_ = vocabulary
+    vectorizer.fixed_vocabulary_ = False
+    if hasattr(vectorizer, 'use_idf'):
+        # Same weighting as TfidfVectorizer.fit; the public idf_ setter then hands the
+        # fitted weights to the vectorizer, which uses them in transform
+        tfidf = TfidfTransformer(norm=vectorizer.norm, use_idf=vectorizer.use_idf,
+                                 smooth_idf=vectorizer.smooth_idf, sublinear_tf=vectorizer.sublinear_tf)
+        tfidf.fit(X_train)
+        X_train = tfidf.transform(X_train, copy=False)
+        X_test = tfidf.transform(X_test, copy=False)
+        vectorizer.idf_ = tfidf.idf_
+
+    logging.info('Incremental features: %d rows reused, %d rows analyzed, vocabulary of %d terms (%s)',
+                 cache.hits, cache.misses, len(vocabulary),
+                 'unchanged' if cache.vocabulary_digest == vocabulary_digest(vocabulary) else 'changed')
+    return X_train.tocsr(), X_test.tocsr()
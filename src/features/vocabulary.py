@@ -0,0 +1,215 @@
+# pickle-free vectorizer artifact with a memory-mapped vocabulary
+
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+# Now import from src
+try:
+    from src.logger import logging
+except ImportError:
+    # If the above import fails, set up basic logging
+    import logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+# vocabulary.bin layout (little-endian), every section 8-byte aligned:
+#   magic (8 bytes) | n_terms, n_buckets, blob_size (uint64 each)
+#   offsets: int64[n_terms + 1], byte offsets of each sorted term in the blob
+#   columns: int64[n_terms], feature column of each sorted term
+#   buckets: int64[n_buckets], open-addressing hash index (crc32) of term ordinals, -1 if empty
+#   blob: the UTF-8 encoded terms, concatenated in sorted order
+VOCABULARY_MAGIC = b'VOCAB01\0'
+HEADER = struct.Struct('<8sQQQ')
+
+# Constructor settings that reproduce the vectorizer's analyzer and weighting
+EXPORTED_PARAMS = ('analyzer', 'lowercase', 'token_pattern', 'ngram_range', 'stop_words', 'strip_accents',
+                   'binary', 'dtype', 'n_features', 'alternate_sign', 'norm', 'use_idf', 'smooth_idf',
+                   'sublinear_tf')
+
+
+def write_vocabulary(vocabulary: dict, file_path: str) -> None:
+    """Write a term -> column mapping as a sorted string table with a hash index."""
+    terms = sorted(vocabulary)
+    encoded = [term.encode('utf-8') for term in terms]
+    offsets = np.zeros(len(terms) + 1, dtype='<i8')
+    offsets[1:] = np.cumsum([len(term) for term in encoded])
+    columns = np.array([vocabulary[term] for term in terms], dtype='<i8')
+
+    # Power of two with at most 50% load, so probe sequences stay short
+    n_buckets = 1
+    while n_buckets < 2 * len(terms):
+        n_buckets *= 2
+    buckets = np.full(n_buckets, -1, dtype='<i8')
+    mask = n_buckets - 1
+    for ordinal, key in enumerate(encoded):
+        slot = zlib.crc32(key) & mask
+        while buckets[slot] >= 0:
+            slot = (slot + 1) & mask
+        buckets[slot] = ordinal
+
+    blob = b''.join(encoded)
+    with open(file_path, 'wb') as file:
+        file.write(HEADER.pack(VOCABULARY_MAGIC, len(terms), n_buckets, len(blob)))
+        file.write(offsets.tobytes())
+        file.write(columns.tobytes())
+        file.write(buckets.tobytes())
+        file.write(blob)
+
+
+class MappedVocabulary:
+    """Read-only term -> column lookup over a memory-mapped vocabulary.bin, without a dict."""
+
+    def __init__(self, file_path: str):
+        with open(file_path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_terms, n_buckets, blob_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != VOCABULARY_MAGIC:
+            raise ValueError(f"{file_path} is not a vocabulary file")
+
+        view = memoryview(self._mmap)
+        start = HEADER.size
+        self._offsets = view[start:start + 8 * (n_terms + 1)].cast('q')
+        start += 8 * (n_terms + 1)
+        self._columns = view[start:start + 8 * n_terms].cast('q')
+        start += 8 * n_terms
+        self._buckets = view[start:start + 8 * n_buckets].cast('q')
+        self._blob_start = start + 8 * n_buckets
+        self._mask = n_buckets - 1
+        self.n_terms = n_terms
+
+    def __len__(self):
+        return self.n_terms
+
+    def term(self, ordinal: int) -> str:
+        """Return the term at a position of the sorted string table."""
+        start = self._blob_start
+        return self._mmap[start + self._offsets[ordinal]:start + self._offsets[ordinal + 1]].decode('utf-8')
+
+    def get(self, term: str, default: int = -1) -> int:
+        """Return the feature column of a term, or `default` if it is not in the vocabulary."""
+        key = term.encode('utf-8')
+        buckets, offsets, data, start = self._buckets, self._offsets, self._mmap, self._blob_start
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            ordinal = buckets[slot]
+            if ordinal < 0:
+                return default
+            if data[start + offsets[ordinal]:start + offsets[ordinal + 1]] == key:
+                return self._columns[ordinal]
+            slot = (slot + 1) & self._mask
+
+
+class MappedVectorizer:
+    """
+    Transform-only replacement for a fitted CountVectorizer or TfidfVectorizer.
+
+    Tokens and n-grams come from CountVectorizer.build_analyzer() with the exported
+    settings; they are looked up in a MappedVocabulary and the IDF weights, if any,
+    are memory-mapped as well.
+    """
+
+    def __init__(self, params: dict, vocabulary: MappedVocabulary, n_features: int, idf=None):
+        self.params = params
+        self.vocabulary = vocabulary
+        self.n_features = n_features
+        self.idf = idf
+        self.dtype = np.dtype(params.get('dtype', 'int64'))
+        analyzer_params = {key: params[key] for key in ('analyzer', 'lowercase', 'token_pattern', 'ngram_range',
+                                                        'stop_words', 'strip_accents') if key in params}
+        self._analyzer = CountVectorizer(**analyzer_params).build_analyzer()
+
+    def transform(self, raw_documents):
+        """Return the CSR feature matrix of a list of documents."""
+        lookup = self.vocabulary.get
+        binary = self.params.get('binary', False)
+        indices, values, indptr = [], [], [0]
+        for document in raw_documents:
+            counts = {}
+            for term in self._analyzer(document):
+                column = lookup(term)
+                if column >= 0:
+                    counts[column] = 1 if binary else counts.get(column, 0) + 1
+            indices.extend(counts.keys())
+            values.extend(counts.values())
+            indptr.append(len(indices))
+
+        X = sparse.csr_matrix((np.asarray(values, dtype=self.dtype), indices, indptr),
+                              shape=(len(indptr) - 1, self.n_features))
+        X.sort_indices()
+
+        if self.idf is None:
+            return X
+        # Same steps as sklearn's TfidfTransformer
+        if self.params.get('sublinear_tf'):
+            np.log(X.data, X.data)
+            X.data += 1.0
+        X.data *= self.idf[X.indices]
+        if self.params.get('norm'):
+            X = normalize(X, norm=self.params['norm'], copy=False)
+        return X
+
+
+def export_vectorizer(vectorizer, directory: str) -> None:
+    """
+    Write a fitted vectorizer as meta.json, vocabulary.bin and (for TF-IDF) idf.npy.
+
+    Raises:
+        ValueError: If the vectorizer uses a custom callable analyzer, tokenizer or preprocessor.
+    """
+    try:
+        if callable(vectorizer.analyzer) or vectorizer.tokenizer or vectorizer.preprocessor:
+            raise ValueError("Vectorizers with custom callables cannot be exported")
+
+        params = {key: value for key, value in vectorizer.get_params().items() if key in EXPORTED_PARAMS}
+        params['dtype'] = np.dtype(params['dtype']).name
+        params['ngram_range'] = list(params['ngram_range'])
+
+        os.makedirs(directory, exist_ok=True)
+        if isinstance(vectorizer, HashingVectorizer):
+            meta = {'method': 'hashing', 'params': params}
+        else:
+            meta = {'method': 'tfidf' if hasattr(vectorizer, 'idf_') else 'bow', 'params': params,
+                    'n_features': len(vectorizer.vocabulary_)}
+            write_vocabulary(vectorizer.vocabulary_, os.path.join(directory, 'vocabulary.bin'))
+            if hasattr(vectorizer, 'idf_'):
+                np.save(os.path.join(directory, 'idf.npy'), vectorizer.idf_)
+
+        with open(os.path.join(directory, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+        logging.info('Vectorizer (%s) exported to %s', meta['method'], directory)
+    except Exception as e:
+        logging.error('Error occurred while exporting the vectorizer: %s', e)
+        raise
+
+
+def load_vectorizer(directory: str):
+    """Load a vectorizer written by export_vectorizer, memory-mapping its vocabulary."""
+    with open(os.path.join(directory, 'meta.json'), 'r') as file:
+        meta = json.load(file)
+
+    params = dict(meta['params'], ngram_range=tuple(meta['params']['ngram_range']))
+    if meta['method'] == 'hashing':
+        # Stateless, nothing to map
+        return HashingVectorizer(**dict(params, dtype=np.dtype(params['dtype']).type))
+
+    idf = None
+    if meta['method'] == 'tfidf':
+        idf = np.load(os.path.join(directory, 'idf.npy'), mmap_mode='r')
+    vocabulary = MappedVocabulary(os.path.join(directory, 'vocabulary.bin'))
+    return MappedVectorizer(params, vocabulary, meta['n_features'], idf)
@@ -0,0 +1,247 @@
+# hyperparameter search
+
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import yaml
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.data.artifacts import artifact_path, read_table
+from src.features.feature_engineering import build_vectorizer
+
+# Now import from src
+try:
+    from src.logger import logging
+except ImportError:
+    # If the above import fails, set up basic logging
+    import logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+# Fold matrices of the current search, set in each worker process by _init_worker
+_FOLDS = None
+
+
+def load_params(params_path: str) -> dict:
+    """Load parameters from a YAML file."""
+    try:
+        with open(params_path, 'r') as file:
+            params = yaml.safe_load(file)
+        logging.debug('Parameters retrieved from %s', params_path)
+        return params
+    except FileNotFoundError:
+        logging.error('File not found: %s', params_path)
+        raise
+    except yaml.YAMLError as e:
+        logging.error('YAML error: %s', e)
+        raise
+    except Exception as e:
+        logging.error('Unexpected error: %s', e)
+        raise
+
+def build_folds(texts, labels, cv: int = 5, max_features: int = 100, ngram_range=(1, 1), min_df=1, max_df=1.0,
+                random_state: int = None) -> list:
+    """
+    Vectorize each cross-validation fold once, for the largest max_features of the grid.
+
+    Each fold is a dict with the training and validation count matrices, the labels, a
+    shuffled order of the training rows (for training on subsets) and the columns ranked
+    by corpus frequency. The first k ranked columns are the vocabulary that
+    CountVectorizer(max_features=k) would have kept, so smaller vocabularies are column
+    subsets of the same matrices.
+    """
+    folds = []
+    rng = np.random.RandomState(random_state)
+    splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    for train_index, val_index in splitter.split(texts, labels):
+        vectorizer = build_vectorizer('bow', max_features, ngram_range=ngram_range, min_df=min_df, max_df=max_df)
+        X_train = vectorizer.fit_transform(texts[train_index])
+        term_frequencies = np.asarray(X_train.sum(axis=0)).ravel()
+        folds.append({
+            'X_train': X_train,
+            'y_train': labels[train_index],
+            'X_val': vectorizer.transform(texts[val_index]),
+            'y_val': labels[val_index],
+            'row_order': rng.permutation(len(train_index)),
+            'column_rank': np.argsort(-term_frequencies, kind='stable'),
+        })
+    return folds
+
+def _init_worker(folds):
+    global _FOLDS
+    _FOLDS = folds
+
+def _evaluate(task):
+    """Fit one configuration on the first n_samples shuffled rows of one fold; returns the validation ROC AUC."""
+    candidate, fold_index, n_samples, model_params = task
+    fold = _FOLDS[fold_index]
+    columns = np.sort(fold['column_rank'][:candidate['max_features']])
+    rows = fold['row_order'][:n_samples]
+
+    clf = LogisticRegression(C=candidate['C'], penalty=candidate['penalty'], **model_params)
+    clf.fit(fold['X_train'][rows][:, columns], fold['y_train'][rows])
+    scores = clf.decision_function(fold['X_val'][:, columns])
+    return roc_auc_score(fold['y_val'], scores)
+
+def successive_halving(folds, candidates: list, model_params: dict, factor: int = 3, min_samples: int = 200,
+                       executor=None) -> list:
+    """
+    Cross-validate candidates with successive halving.
+
+    Every round scores the surviving candidates on all folds using a subset of the training
+    rows, then keeps the best 1/factor of them for the next round, which uses factor times
+    as many rows. The last round uses all training rows.
+
+    Returns:
+        list: One trial dict per (round, candidate) with the mean and std of the fold scores.
+    """
+    n_rows = min(len(fold['row_order']) for fold in folds)
+    n_rounds = 1 + int(math.floor(math.log(len(candidates), factor))) if len(candidates) > 1 else 1
+    survivors, trials = list(candidates), []
+
+    for round_index in range(n_rounds):
+        n_samples = max(min(min_samples, n_rows), n_rows // factor ** (n_rounds - 1 - round_index))
+        tasks = [(candidate, fold_index, n_samples, model_params)
+                 for candidate in survivors for fold_index in range(len(folds))]
+        start_time = time.perf_counter()
+        if executor is None:
+            _init_worker(folds)
+            scores = list(map(_evaluate, tasks))
+        else:
+            scores = list(executor.map(_evaluate, tasks))
+
+        round_trials = []
+        for i, candidate in enumerate(survivors):
+            fold_scores = scores[i * len(folds):(i + 1) * len(folds)]
+            round_trials.append(dict(candidate, round=round_index, n_samples=n_samples,
+                                     mean_score=float(np.mean(fold_scores)), std_score=float(np.std(fold_scores))))
+        trials.extend(round_trials)
+        logging.info('Round %d: %d candidates on %d rows per fold in %.2fs, best ROC AUC %.4f',
+                     round_index, len(survivors), n_samples, time.perf_counter() - start_time,
+                     max(trial['mean_score'] for trial in round_trials))
+
+        ranked = sorted(round_trials, key=lambda trial: trial['mean_score'], reverse=True)
+        keep = max(1, math.ceil(len(survivors) / factor))
+        survivors = [{key: trial[key] for key in ('C', 'penalty', 'max_features')} for trial in ranked[:keep]]
+
+    return trials
+
+def setup_mlflow_tracking() -> None:
+    """Track to DagsHub when CAPSTONE_TEST is set, otherwise to ./mlruns, like model_evaluation."""
+    import mlflow
+
+    dagshub_token = os.getenv("CAPSTONE_TEST")
+    if dagshub_token:
+        import dagshub
+
+        os.environ["MLFLOW_TRACKING_USERNAME"] = dagshub_token
+        os.environ["MLFLOW_TRACKING_PASSWORD"] = dagshub_token
+        mlflow.set_tracking_uri("https://dagshub.com/jaggusuperhit/capstone.mlflow")
+        dagshub.init(repo_owner="jaggusuperhit", repo_name="capstone", mlflow=True)
+    else:
+        mlflow_dir = os.path.join(os.getcwd(), "mlruns")
+        os.makedirs(mlflow_dir, exist_ok=True)
+        mlflow.set_tracking_uri(f"file://{mlflow_dir}")
+
+def log_trials_to_mlflow(trials: list, best: dict, search_params: dict) -> None:
+    """Log the search and every trial to one MLflow run with a single log_batch call."""
+    import mlflow
+    from mlflow.entities import Metric, Param
+
+    setup_mlflow_tracking()
+    mlflow.set_experiment("hyperparameter-search")
+    with mlflow.start_run(run_name="hyperparameter_search") as run:
+        timestamp = int(time.time() * 1000)
+        # Each trial is one step of the per-trial metrics
+        metrics = []
+        for step, trial in enumerate(trials):
+            for key in ('mean_score', 'std_score', 'C', 'max_features', 'n_samples', 'round'):
+                metrics.append(Metric(f"trial_{key}", float(trial[key]), timestamp, step))
+            metrics.append(Metric("trial_penalty_l1", float(trial['penalty'] == 'l1'), timestamp, step))
+        metrics.append(Metric("best_cv_roc_auc", best['mean_score'], timestamp, 0))
+        params = [Param(f"best_{key}", str(best[key])) for key in ('C', 'penalty', 'max_features')]
+        params += [Param(key, str(value)) for key, value in search_params.items()]
+
+        # One request for the whole search, unless it exceeds MLflow's 1000 metrics per batch
+        client = mlflow.MlflowClient()
+        for start in range(0, len(metrics), 1000):
+            client.log_batch(run.info.run_id, metrics=metrics[start:start + 1000],
+                             params=params if start == 0 else [])
+        print(f"Logged {len(trials)} trials to MLflow run {run.info.run_id}")
+
+def main():
+    try:
+        print("Starting hyperparameter search...")
+
+        params = load_params('params.yaml')
+        search_params = params['hyperparameter_search']
+        training_params = params.get('model_training', {})
+        feature_params = params.get('feature_engineering', {})
+        text_format = params.get('artifacts', {}).get('text_format', 'csv')
+        cv = training_params.get('cv', 5)
+        random_state = training_params.get('random_state')
+
+        candidates = [{'C': C, 'penalty': penalty, 'max_features': max_features}
+                      for C, penalty, max_features in itertools.product(
+                          search_params['C'], search_params['penalty'], search_params['max_features'])]
+        model_params = {'solver': training_params.get('solver', 'liblinear'),
+                        'max_iter': training_params.get('max_iter', 100), 'random_state': random_state}
+        print(f"Searching {len(candidates)} configurations with {cv}-fold CV, model parameters {model_params}")
+
+        # Load data
+        train_data = read_table(artifact_path('./data/interim', 'train_processed', text_format)).fillna('')
+        texts, labels = train_data['review'].values, train_data['sentiment'].values
+        print(f"Train data shape: {train_data.shape}")
+
+        start_time = time.perf_counter()
+        folds = build_folds(texts, labels, cv, max(search_params['max_features']),
+                            tuple(feature_params.get('ngram_range', (1, 1))), feature_params.get('min_df', 1),
+                            feature_params.get('max_df', 1.0), random_state)
+        print(f"Vectorized {cv} folds in {time.perf_counter() - start_time:.2f}s")
+
+        n_jobs = search_params.get('n_jobs', -1)
+        n_workers = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+        # The folds are sent to each worker once, not with every task
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(folds,)) as executor:
+            trials = successive_halving(folds, candidates, model_params, search_params.get('factor', 3),
+                                        search_params.get('min_samples', 200), executor)
+
+        final_round = max(trial['round'] for trial in trials)
+        best = max((trial for trial in trials if trial['round'] == final_round), key=lambda trial: trial['mean_score'])
+        print(f"Best configuration: C={best['C']}, penalty={best['penalty']}, max_features={best['max_features']} "
+              f"(ROC AUC {best['mean_score']:.4f} +/- {best['std_score']:.4f}) "
+              f"after {len(trials)} trials in {time.perf_counter() - start_time:.2f}s")
+
+        os.makedirs('reports', exist_ok=True)
+        with open('reports/hyperparameter_search.json', 'w') as file:
+            json.dump({'best': best, 'cv': cv, 'trials': trials}, file, indent=4)
+
+        try:
+            log_trials_to_mlflow(trials, best, {'cv': cv, 'random_state': random_state,
+                                                'factor': search_params.get('factor', 3)})
+        except Exception as e:
+            logging.error('Failed to log the trials to MLflow: %s', e)
+            print(f"Continuing without MLflow tracking: {e}")
+
+        print("Hyperparameter search completed successfully!")
+    except Exception as e:
+        logging.error('Failed to complete the hyperparameter search: %s', e)
+        print(f"Error: {e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# linear scorer export
+
+import json
+import math
+import numpy as np
+import os
+import pickle
+import re
+import sys
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+# Now import from src
+try:
+    from src.logger import logging
+except ImportError:
+    # If the above import fails, set up basic logging
+    import logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+
+def export_scorer(model, vectorizer) -> dict:
+    """
+    Build a compact scorer artifact from a binary linear model over count features.
+
+    Only the non-zero coefficients are kept, mapped from their vocabulary term, together
+    with the intercept and the tokenization settings needed to reproduce the vectorizer.
+
+    Raises:
+        ValueError: If the vectorizer is not a plain word-count vectorizer with a
+            vocabulary, or the model is not a binary linear classifier.
+    """
+    if not hasattr(vectorizer, 'vocabulary_') or hasattr(vectorizer, 'idf_'):
+        raise ValueError(f"{type(vectorizer).__name__} is not a count vectorizer with a vocabulary")
+    if vectorizer.analyzer != 'word' or vectorizer.binary or vectorizer.tokenizer or vectorizer.preprocessor \
+            or vectorizer.strip_accents or vectorizer.stop_words:
+        raise ValueError("Only the default word analyzer over raw counts can be exported")
+    if not hasattr(model, 'coef_') or model.coef_.shape[0] != 1:
+        raise ValueError(f"{type(model).__name__} is not a binary linear classifier")
+
+    coef = model.coef_[0]
+    weights = {term: float(coef[index]) for term, index in vectorizer.vocabulary_.items() if coef[index] != 0}
+
+    return {
+        'intercept': float(model.intercept_[0]),
+        'classes': [c.item() if hasattr(c, 'item') else c for c in model.classes_],
+        'token_pattern': vectorizer.token_pattern,
+        'lowercase': vectorizer.lowercase,
+        'ngram_range': list(vectorizer.ngram_range),
+        'weights': weights,
+    }
+
+
+def save_scorer(scorer: dict, file_path: str) -> None:
+    """Save the scorer artifact as JSON."""
+    try:
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        with open(file_path, 'w') as file:
+            json.dump(scorer, file)
+        logging.info('Scorer with %d non-zero weights saved to %s', len(scorer['weights']), file_path)
+    except Exception as e:
+        logging.error('Error occurred while saving the scorer: %s', e)
+        raise
+
+
+class LinearScorer:
+    """Score texts by summing the weights of their tokens, without sklearn or pandas."""
+
+    def __init__(self, scorer: dict):
+        self.intercept = scorer['intercept']
+        self.classes = scorer['classes']
+        self.weights = scorer['weights']
+        self.lowercase = scorer['lowercase']
+        self.min_n, self.max_n = scorer['ngram_range']
+        self.token_pattern = re.compile(scorer['token_pattern'])
+
+    @classmethod
+    def load(cls, file_path: str) -> 'LinearScorer':
+        """Load a scorer artifact written by save_scorer."""
+        with open(file_path, 'r') as file:
+            scorer = json.load(file)
+        if 'unsupported' in scorer:
+            raise ValueError(f"No scorer was exported: {scorer['unsupported']}")
+        return cls(scorer)
+
+    def _terms(self, text: str) -> list:
+        """Reproduce the vectorizer's terms (tokens and n-grams) for one text."""
+        tokens = self.token_pattern.findall(text.lower() if self.lowercase else text)
+        if self.max_n == 1:
+            return tokens
+        terms = tokens if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), self.max_n + 1):
+            terms = terms + [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        return terms
+
+    def decision_function(self, text: str) -> float:
+        """Return the linear score (logit) of the positive class for one text."""
+        weights = self.weights
+        return self.intercept + sum(weights.get(term, 0.0) for term in self._terms(text))
+
+    def predict_batch(self, texts) -> tuple:
+        """Return (labels, positive-class probabilities) for a list of texts."""
+        labels, probabilities = [], []
+        for text in texts:
+            score = self.decision_function(text)
+            labels.append(self.classes[1] if score > 0 else self.classes[0])
+            # Numerically stable logistic function
+            if score >= 0:
+                probabilities.append(1.0 / (1.0 + math.exp(-score)))
+            else:
+                probabilities.append(math.exp(score) / (1.0 + math.exp(score)))
+        return labels, probabilities
+
+
+def save_mapped_scorer(scorer: dict, directory: str) -> None:
+    """
+    Save the scorer as arrays that MappedLinearScorer memory-maps.
+
+    terms.npy holds the sorted terms as a fixed-width string array and weights.npy the
+    matching coefficients; the remaining settings go to meta.json.
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        terms = sorted(scorer['weights'])
+        np.save(os.path.join(directory, 'terms.npy'), np.array(terms, dtype=str))
+        np.save(os.path.join(directory, 'weights.npy'),
+                np.array([scorer['weights'][term] for term in terms], dtype=np.float64))
+        meta = {key: value for key, value in scorer.items() if key != 'weights'}
+        with open(os.path.join(directory, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+        logging.info('Memory-mappable scorer with %d terms saved to %s', len(terms), directory)
+    except Exception as e:
+        logging.error('Error occurred while saving the memory-mappable scorer: %s', e)
+        raise
+
+
+class MappedLinearScorer(LinearScorer):
+    """
+    LinearScorer over read-only memory-mapped term and weight arrays.
+
+    Every process that loads the same files shares their pages through the OS page
+    cache, so additional server workers add almost no memory for the weights.
+    Terms are looked up with a binary search over the sorted term array.
+    """
+
+    def __init__(self, meta: dict, terms: np.ndarray, weights: np.ndarray):
+        super().__init__(dict(meta, weights={}))
+        self.terms = terms
+        self.weights = weights
+
+    @classmethod
+    def load(cls, directory: str) -> 'MappedLinearScorer':
+        """Map a scorer written by save_mapped_scorer."""
+        with open(os.path.join(directory, 'meta.json'), 'r') as file:
+            meta = json.load(file)
+        if 'unsupported' in meta:
+            raise ValueError(f"No scorer was exported: {meta['unsupported']}")
+        terms = np.load(os.path.join(directory, 'terms.npy'), mmap_mode='r')
+        weights = np.load(os.path.join(directory, 'weights.npy'), mmap_mode='r')
+        return cls(meta, terms, weights)
+
+    def decision_scores(self, texts) -> np.ndarray:
+        """Return the linear scores of a list of texts with one vectorized lookup."""
+        text_terms = [self._terms(text) for text in texts]
+        counts = [len(terms) for terms in text_terms]
+        scores = np.full(len(texts), self.intercept)
+        if not any(counts) or len(self.terms) == 0:
+            return scores
+
+        queries = np.array([term for terms in text_terms for term in terms], dtype=str)
+        positions = np.minimum(np.searchsorted(self.terms, queries), len(self.terms) - 1)
+        found = self.terms[positions] == queries
+        contributions = np.where(found, self.weights[positions], 0.0)
+        scores += np.bincount(np.repeat(np.arange(len(texts)), counts), weights=contributions,
+                              minlength=len(texts))
+        return scores
+
+    def decision_function(self, text: str) -> float:
+        return float(self.decision_scores([text])[0])
+
+    def predict_batch(self, texts) -> tuple:
+        scores = self.decision_scores(texts)
+        labels = [self.classes[1] if score > 0 else self.classes[0] for score in scores]
+        # Numerically stable logistic function
+        probabilities = np.where(scores >= 0, 1.0 / (1.0 + np.exp(-np.abs(scores))),
+                                 np.exp(-np.abs(scores)) / (1.0 + np.exp(-np.abs(scores))))
+        return labels, probabilities.tolist()
+
+
+def main():
+    try:
+        print("Starting scorer export...")
+
+        with open('./models/model.pkl', 'rb') as file:
+            model = pickle.load(file)
+        with open('./models/vectorizer.pkl', 'rb') as file:
+            vectorizer = pickle.load(file)
+
+        try:
+            scorer = export_scorer(model, vectorizer)
+        except ValueError as e:
+            # Keep the DVC output in place; serving falls back to the MLflow model
+            print(f"Model cannot be exported as a linear scorer: {e}")
+            with open('./models/scorer.json', 'w') as file:
+                json.dump({'unsupported': str(e)}, file)
+            os.makedirs('./models/scorer_mmap', exist_ok=True)
+            with open('./models/scorer_mmap/meta.json', 'w') as file:
+                json.dump({'unsupported': str(e)}, file)
+            return
+
+        print(f"Kept {len(scorer['weights'])} non-zero weights out of {model.coef_.shape[1]} coefficients")
+        save_scorer(scorer, './models/scorer.json')
+        save_mapped_scorer(scorer, './models/scorer_mmap')
+        print("Scorer export completed successfully!")
+    except Exception as e:
+        logging.error('Failed to complete the scorer export: %s', e)
+        print(f"Error: {e}")
+
+if __name__ == '__main__':
+    main()
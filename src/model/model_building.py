@@ -3,12 +3,25 @@ import pandas as pd
 import pickle
 import os
 import sys
-from sklearn.linear_model import LogisticRegression
+import time
+import tracemalloc
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 import yaml
 
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then left out of the training log
+    resource = None
+
+# Solvers that fit float32 input without converting it to float64; liblinear always works in float64
+FLOAT32_SOLVERS = ('lbfgs', 'newton-cg', 'newton-cholesky', 'sag', 'saga')
+
 # Add the project root directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from src.data.artifacts import artifact_path, iter_feature_chunks, load_features, load_labels
+
 # Now import from src
 try:
     from src.logger import logging
@@ -24,12 +37,29 @@ except ImportError:
     )
 
 
-def load_data(file_path: str) -> pd.DataFrame:
-    """Load data from a CSV file."""
+def load_params(params_path: str) -> dict:
+    """Load parameters from a YAML file."""
+    try:
+        with open(params_path, 'r') as file:
+            params = yaml.safe_load(file)
+        logging.debug('Parameters retrieved from %s', params_path)
+        return params
+    except FileNotFoundError:
+        logging.error('File not found: %s', params_path)
+        raise
+    except yaml.YAMLError as e:
+        logging.error('YAML error: %s', e)
+        raise
+    except Exception as e:
+        logging.error('Unexpected error: %s', e)
+        raise
+
+def load_data(file_path: str) -> tuple:
+    """Load the feature matrix and labels; sparse .npz features are not densified."""
     try:
-        df = pd.read_csv(file_path)
+        X, y = load_features(file_path)
         logging.info('Data loaded from %s', file_path)
-        return df
+        return X, y
     except pd.errors.ParserError as e:
         logging.error('Failed to parse the CSV file: %s', e)
         raise
@@ -37,17 +67,104 @@ def load_data(file_path: str) -> pd.DataFrame:
         logging.error('Unexpected error occurred while loading the data: %s', e)
         raise
 
-def train_model(X_train: np.ndarray, y_train: np.ndarray) -> LogisticRegression:
-    """Train the Logistic Regression model."""
+def max_rss_report() -> str:
+    """Return the peak resident set size of the process for the training log, or '' without `resource`."""
+    if resource is None:
+        return ''
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return ', process max RSS %.1f MiB' % (max_rss / 2 ** 10)
+
+def train_model(X_train, y_train: np.ndarray, solver: str = 'liblinear', penalty: str = 'l1', C: float = 1.0,
+                n_jobs: int = None, dtype: str = 'float64', max_iter: int = 100,
+                random_state: int = None) -> LogisticRegression:
+    """
+    Train the Logistic Regression model on a dense array or a scipy CSR matrix.
+
+    Args:
+        solver (str): 'liblinear', 'lbfgs', 'newton-cg', 'newton-cholesky', 'sag' or 'saga'.
+        penalty (str): 'l1', 'l2', 'elasticnet' or None; must be supported by the solver.
+        C (float): Inverse regularization strength.
+        n_jobs (int): Passed to LogisticRegression when set.
+        dtype (str): Feature dtype used for fitting. 'float32' halves the memory of the
+            training matrix; it is only applied for FLOAT32_SOLVERS, since liblinear would
+            convert the cast matrix back to float64.
+        max_iter (int): Maximum number of solver iterations.
+        random_state (int): Seed for the solvers that shuffle the data.
+    """
     try:
-        clf = LogisticRegression(C=1, solver='liblinear', penalty='l1')
+        if np.dtype(dtype) == np.float32 and solver not in FLOAT32_SOLVERS:
+            logging.info('Solver %s fits in float64; keeping the %s input instead of casting to float32',
+                         solver, X_train.dtype)
+        else:
+            logging.info('Casting the training matrix from %s to %s for solver %s', X_train.dtype, dtype, solver)
+            X_train = X_train.astype(dtype, copy=False)
+        kwargs = {'C': C, 'solver': solver, 'max_iter': max_iter, 'random_state': random_state}
+        # Only pass what is set, so defaults deprecated by newer scikit-learn releases stay untouched
+        if penalty is not None:
+            kwargs['penalty'] = penalty
+        if n_jobs is not None:
+            kwargs['n_jobs'] = n_jobs
+        clf = LogisticRegression(**kwargs)
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
         clf.fit(X_train, y_train)
-        logging.info('Model training completed')
+        fit_time = time.perf_counter() - start_time
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        logging.info('Model training completed: solver=%s, penalty=%s, C=%s, dtype=%s, %s input %s, '
+                     'fit time %.2fs, peak traced allocations %.1f MiB%s',
+                     solver, penalty, C, X_train.dtype, 'sparse' if hasattr(X_train, 'nnz') else 'dense',
+                     X_train.shape, fit_time, traced_peak / 2 ** 20, max_rss_report())
         return clf
     except Exception as e:
         logging.error('Error during model training: %s', e)
         raise
 
+def train_incremental(file_path: str, epochs: int = 5, chunksize: int = 10000, alpha: float = 0.0001,
+                      dtype: str = 'float64', random_state: int = None) -> SGDClassifier:
+    """
+    Train a logistic-loss SGDClassifier out of core with partial_fit.
+
+    Feature chunks are streamed from `file_path` for each epoch, so only one chunk of the
+    training matrix is in memory at a time. Rows are shuffled within each chunk.
+
+    Args:
+        file_path (str): Training features saved by save_features (.npz, .npy or CSV).
+        epochs (int): Number of passes over the training data.
+        chunksize (int): Rows per partial_fit call.
+        alpha (float): L2 regularization strength.
+        dtype (str): Feature dtype used for fitting.
+        random_state (int): Seed for the model and the row shuffling.
+    """
+    try:
+        classes = np.unique(load_labels(file_path))
+        clf = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+        rng = np.random.RandomState(random_state)
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        for epoch in range(epochs):
+            epoch_start, rows = time.perf_counter(), 0
+            for X_chunk, y_chunk in iter_feature_chunks(file_path, chunksize):
+                order = rng.permutation(X_chunk.shape[0])
+                clf.partial_fit(X_chunk[order].astype(dtype, copy=False), y_chunk[order], classes=classes)
+                rows += X_chunk.shape[0]
+            logging.info('Epoch %d/%d: %d rows in %.2fs', epoch + 1, epochs, rows, time.perf_counter() - epoch_start)
+        fit_time = time.perf_counter() - start_time
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        logging.info('Incremental training completed: %d epochs, chunksize %d, alpha=%s, dtype=%s, '
+                     'fit time %.2fs, peak traced allocations %.1f MiB%s',
+                     epochs, chunksize, alpha, dtype, fit_time, traced_peak / 2 ** 20, max_rss_report())
+        return clf
+    except Exception as e:
+        logging.error('Error during incremental model training: %s', e)
+        raise
+
 def save_model(model, file_path: str) -> None:
     """Save the trained model to a file."""
     try:
@@ -62,16 +179,40 @@ def main():
     try:
         print("Starting model building process...")
 
-        # Load data
-        print("Loading processed data...")
-        train_data = load_data('./data/processed/train_bow.csv')
-        X_train = train_data.iloc[:, :-1].values
-        y_train = train_data.iloc[:, -1].values
-        print(f"Training data shape: X_train {X_train.shape}, y_train {y_train.shape}")
+        # Load parameters
+        try:
+            params = load_params('params.yaml')
+            features_format = params.get('artifacts', {}).get('features_format', 'csv')
+            training_params = params.get('model_training', {})
+        except Exception as e:
+            print(f"Failed to load parameters: {e}. Using default features_format=csv")
+            features_format, training_params = 'csv', {}
+        mode = training_params.get('mode', 'batch')
+        train_path = artifact_path('./data/processed', 'train_bow', features_format)
+
+        if mode == 'incremental':
+            incremental_kwargs = {key: training_params[key] for key in
+                                  ('epochs', 'chunksize', 'alpha', 'dtype', 'random_state')
+                                  if key in training_params}
+            print(f"Incremental training parameters: {incremental_kwargs}")
+
+            # Train model, streaming the features
+            print("\nTraining logistic-loss SGD model incrementally...")
+            clf = train_incremental(train_path, **incremental_kwargs)
+        else:
+            model_kwargs = {key: training_params[key] for key in
+                            ('solver', 'penalty', 'C', 'n_jobs', 'dtype', 'max_iter', 'random_state')
+                            if key in training_params}
+            print(f"Model training parameters: {model_kwargs}")
+
+            # Load data
+            print("Loading processed data...")
+            X_train, y_train = load_data(train_path)
+            print(f"Training data shape: X_train {X_train.shape}, y_train {y_train.shape}")
 
-        # Train model
-        print("\nTraining logistic regression model...")
-        clf = train_model(X_train, y_train)
+            # Train model
+            print("\nTraining logistic regression model...")
+            clf = train_model(X_train, y_train, **model_kwargs)
         print(f"Model training completed. Model coefficients shape: {clf.coef_.shape}")
 
         # Save model
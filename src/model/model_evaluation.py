@@ -9,10 +9,13 @@ import mlflow.sklearn
 import dagshub
 import os
 import sys
+import yaml
 
 # Add the project root directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from src.data.artifacts import artifact_path, load_features
+
 # Now import from src
 try:
     from src.logger import logging
@@ -90,12 +93,29 @@ def load_model(file_path: str):
         logging.error('Unexpected error occurred while loading the model: %s', e)
         raise
 
-def load_data(file_path: str) -> pd.DataFrame:
-    """Load data from a CSV file."""
+def load_params(params_path: str) -> dict:
+    """Load parameters from a YAML file."""
     try:
-        df = pd.read_csv(file_path)
+        with open(params_path, 'r') as file:
+            params = yaml.safe_load(file)
+        logging.debug('Parameters retrieved from %s', params_path)
+        return params
+    except FileNotFoundError:
+        logging.error('File not found: %s', params_path)
+        raise
+    except yaml.YAMLError as e:
+        logging.error('YAML error: %s', e)
+        raise
+    except Exception as e:
+        logging.error('Unexpected error: %s', e)
+        raise
+
+def load_data(file_path: str) -> tuple:
+    """Load the feature matrix and labels; sparse .npz features are not densified."""
+    try:
+        X, y = load_features(file_path)
         logging.info('Data loaded from %s', file_path)
-        return df
+        return X, y
     except pd.errors.ParserError as e:
         logging.error('Failed to parse the CSV file: %s', e)
         raise
@@ -158,12 +178,16 @@ def main():
         print("Loading model...")
         clf = load_model('./models/model.pkl')
 
+        # Load parameters
+        try:
+            features_format = load_params('params.yaml').get('artifacts', {}).get('features_format', 'csv')
+        except Exception as e:
+            print(f"Failed to load parameters: {e}. Using default features_format=csv")
+            features_format = 'csv'
+
         # Load test data
         print("Loading test data...")
-        test_data = load_data('./data/processed/test_bow.csv')
-
-        X_test = test_data.iloc[:, :-1].values
-        y_test = test_data.iloc[:, -1].values
+        X_test, y_test = load_data(artifact_path('./data/processed', 'test_bow', features_format))
         print(f"Test data shape: X_test {X_test.shape}, y_test {y_test.shape}")
 
         # Evaluate model
@@ -212,6 +236,12 @@ def main():
                 print("Logging model to MLflow...")
                 mlflow.sklearn.log_model(clf, "model")
 
+                # Log the vectorizer the model was trained with, so the app loads both from one version
+                print("Logging vectorizer to MLflow...")
+                mlflow.log_artifact('models/vectorizer.pkl', artifact_path='vectorizer')
+                if os.path.isdir('models/vectorizer_vocab'):
+                    mlflow.log_artifacts('models/vectorizer_vocab', artifact_path='vectorizer/vectorizer_vocab')
+
                 # Save model info
                 print("Saving model info...")
                 save_model_info(run.info.run_id, "model", 'reports/experiment_info.json')
@@ -0,0 +1,2 @@
+from src.text.normalization import lemmatize, normalize_text, tokenize
+from src.text.cache import NormalizedTextCache
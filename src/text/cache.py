@@ -0,0 +1,112 @@
+"""
+Persistent, content-addressed cache of normalized texts.
+
+Maps a hash of the raw text to the output of normalize_text in a local SQLite file, so
+pipeline runs only normalize reviews they have not seen before. Entries are tied to a
+version derived from the normalizer's source code and the NLTK version; when either
+changes, the cache is emptied instead of returning stale results. The least recently
+used entries are evicted once the stored texts exceed a size limit.
+"""
+import hashlib
+import inspect
+import os
+import sqlite3
+import time
+
+import nltk
+
+from src.text import normalization
+
+# Number of keys per SELECT, below SQLite's limit on bound parameters
+_BATCH = 500
+
+
+def normalizer_version() -> str:
+    """Hash of the normalizer source and the NLTK version its stop words and lemmas come from."""
+    source = inspect.getsource(normalization)
+    return hashlib.blake2b(f"{source}\n{nltk.__version__}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class NormalizedTextCache:
+    """SQLite-backed map from raw text to normalized text, with hit-rate stats and LRU eviction."""
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024, version: str = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version or normalizer_version()
+        self.hits = self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS entries '
+                         '(key BLOB PRIMARY KEY, value TEXT, size INTEGER, last_used REAL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)')
+
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != self.version:
+            # Normalizer code changed: every cached result may be wrong
+            self._db.execute('DELETE FROM entries')
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+        self._db.commit()
+
+    def get_many(self, texts) -> list:
+        """Return the cached normalized text of each raw text, or None where it is not cached."""
+        keys = [_key(text) if isinstance(text, str) else None for text in texts]
+        unique_keys = list({key for key in keys if key is not None})
+        found = {}
+        for start in range(0, len(unique_keys), _BATCH):
+            batch = unique_keys[start:start + _BATCH]
+            query = f"SELECT key, value FROM entries WHERE key IN ({','.join('?' * len(batch))})"
+            found.update(self._db.execute(query, batch).fetchall())
+
+        if found:
+            now = time.time()
+            self._db.executemany('UPDATE entries SET last_used = ? WHERE key = ?', [(now, key) for key in found])
+            self._db.commit()
+
+        results = [found.get(key) if key is not None else None for key in keys]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, pairs) -> None:
+        """Store (raw text, normalized text) pairs."""
+        now = time.time()
+        rows = [(_key(text), value, len(text.encode('utf-8')) + len(value.encode('utf-8')), now)
+                for text, value in pairs if isinstance(text, str)]
+        self._db.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', rows)
+        self._db.commit()
+
+    def size(self) -> int:
+        """Total bytes of the stored raw and normalized texts."""
+        return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits in max_bytes; returns the number removed."""
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return 0
+
+        removed, freed = [], 0
+        for key, size in self._db.execute('SELECT key, size FROM entries ORDER BY last_used'):
+            removed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany('DELETE FROM entries WHERE key = ?', removed)
+        self._db.commit()
+        return len(removed)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,77 @@
+"""
+Text normalization shared by the data_preprocessing DVC stage and the Flask app.
+
+Both training and serving must clean text exactly the same way, otherwise the
+vectorizer sees different tokens at inference time. The steps are applied in a
+single pass over each text:
+
+- Remove URLs
+- Remove numbers
+- Convert to lowercase
+- Replace punctuation with spaces
+- Remove stop words
+- Lemmatize
+"""
+import re
+import string
+import sys
+from functools import lru_cache
+
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+# Bound on memoized lemmas. Review vocabularies are highly Zipfian, so a cache of
+# this size turns the vast majority of WordNet lookups into dict hits.
+LEMMA_CACHE_SIZE = 100_000
+
+# Patterns and translation tables are built once at import time
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+
+# Punctuation becomes a space; every Unicode digit (Arabic-Indic, superscripts, ...),
+# not just ASCII 0-9, and the Arabic semicolon are dropped, as str.isdigit() did
+_DIGITS = [chr(code) for code in range(sys.maxunicode + 1) if chr(code).isdigit()]
+_TRANSLATION_TABLE = str.maketrans(
+    {**{char: ' ' for char in string.punctuation},
+     **{char: None for char in _DIGITS},
+     '؛': None}
+)
+
+
+@lru_cache(maxsize=None)
+def get_stop_words() -> frozenset:
+    """Return the English stop word set, loaded from the NLTK corpus on first use."""
+    return frozenset(stopwords.words("english"))
+
+
+@lru_cache(maxsize=None)
+def get_lemmatizer() -> WordNetLemmatizer:
+    """Return the shared WordNet lemmatizer instance."""
+    return WordNetLemmatizer()
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(word: str) -> str:
+    """Lemmatize a single word, memoized in a bounded LRU cache."""
+    return get_lemmatizer().lemmatize(word)
+
+
+def tokenize(text: str) -> list:
+    """Strip URLs, numbers and punctuation, lowercase and split the text into tokens."""
+    return URL_PATTERN.sub('', text).lower().translate(_TRANSLATION_TABLE).split()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a single text string.
+
+    Args:
+        text (str): The raw text.
+
+    Returns:
+        str: The cleaned text, or an empty string for non-string input.
+    """
+    if not isinstance(text, str):
+        return ""
+
+    stop_words = get_stop_words()
+    return " ".join([lemmatize(word) for word in tokenize(text) if word not in stop_words])
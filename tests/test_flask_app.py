@@ -5,9 +5,16 @@ import unittest
 import os
 import sys
 import json
+import shutil
+import tempfile
+import time
 
 # Add the project root directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'flask_app')))
+
+# Serve the fallback model only, so importing the app does not reach out to MLflow
+os.environ.setdefault("MODEL_LOADING", "off")
 
 class TestFlaskApp(unittest.TestCase):
     """Test cases for the Flask application."""
@@ -30,5 +37,361 @@ class TestFlaskApp(unittest.TestCase):
         # In a real test, you would test the Flask app metrics
         self.assertTrue(True)
 
+
+class TestFlaskEndpoints(unittest.TestCase):
+    """Test cases for the Flask endpoints, served by the fallback model."""
+
+    @classmethod
+    def setUpClass(cls):
+        import app as app_module
+        cls.app_module = app_module
+        cls.client = app_module.app.test_client()
+
+    def test_ready_endpoint(self):
+        """Test that /ready reports readiness once model loading has finished."""
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], "ready")
+
+    def test_batch_predict_rejects_invalid_payload(self):
+        """Test that the batch endpoint validates its JSON body."""
+        for payload in ({"texts": []}, {"texts": "not a list"}, {"text": ["missing key"]}):
+            response = self.client.post("/api/v1/predict", json=payload)
+            self.assertEqual(response.status_code, 400)
+
+    def test_batch_predict(self):
+        """Test that the batch endpoint returns one prediction per text."""
+        from src.text import normalize_text
+        try:
+            normalize_text("warm up")
+        except LookupError as e:
+            self.skipTest(f"NLTK corpora not available: {e}")
+
+        response = self.client.post("/api/v1/predict", json={"texts": ["great wonderful film", "awful boring film"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["predictions"], [1, 0])
+
+    def test_hot_reload_swaps_bundle(self):
+        """Test that a new registry version replaces model and vectorizer together."""
+        from unittest import mock
+        app_module = self.app_module
+        original = app_module.serving
+        new_model, new_vectorizer = object(), object()
+        bundle = app_module.ServingBundle(new_model, new_vectorizer, None, "7")
+        try:
+            with mock.patch.object(app_module, "get_latest_model_version", return_value="7"), \
+                    mock.patch.object(app_module, "load_model", return_value=bundle):
+                self.assertTrue(app_module.reload_model_if_changed())
+                self.assertEqual(app_module.serving, (new_model, new_vectorizer, None, "7"))
+                # The same version is not loaded twice
+                self.assertFalse(app_module.reload_model_if_changed())
+
+            metrics = self.client.get("/metrics").get_data(as_text=True)
+            self.assertIn('model_active_version{model_name="my_model"} 7.0', metrics)
+        finally:
+            app_module.publish(original)
+
+    def test_sparse_model_scores_csr_features(self):
+        """Test that the raw estimator of a pyfunc model scores CSR features like the DataFrame path, without densifying."""
+        from unittest import mock
+        import numpy as np
+        from scipy import sparse
+        from sklearn.feature_extraction.text import CountVectorizer
+        from sklearn.linear_model import LogisticRegression
+        app_module = self.app_module
+
+        texts = ["good great film", "bad awful plot", "great plot", "awful film", "good fun", "dull bad"]
+        vectorizer = CountVectorizer()
+        estimator = LogisticRegression().fit(vectorizer.fit_transform(texts), [1, 0, 1, 0, 1, 0])
+
+        class StubPyfuncModel:
+            """Stands in for mlflow.pyfunc.PyFuncModel: predict takes a DataFrame."""
+            def predict(self, features_df):
+                return estimator.predict(features_df.values)
+
+            def get_raw_model(self):
+                return estimator
+
+        pyfunc_model = StubPyfuncModel()
+        raw_model = app_module.get_raw_model(pyfunc_model)
+        self.assertIs(raw_model, estimator)
+
+        new_texts = ["good film", "awful bad plot", "unseen words only"]
+        dense = app_module.score_texts(app_module.ServingBundle(pyfunc_model, vectorizer, None, "1"), new_texts)
+        dense_calls = []
+        with mock.patch.object(sparse.csr_matrix, "toarray", side_effect=lambda *args: dense_calls.append(args)), \
+                mock.patch.object(sparse.csr_array, "toarray", side_effect=lambda *args: dense_calls.append(args)):
+            predictions, probabilities, model_type = app_module.score_texts(
+                app_module.ServingBundle(pyfunc_model, vectorizer, raw_model, "1"), new_texts)
+
+        self.assertEqual(dense_calls, [])
+        self.assertEqual(model_type, "MLflow Model")
+        self.assertEqual(predictions, dense[0])
+        np.testing.assert_allclose(probabilities, estimator.predict_proba(vectorizer.transform(new_texts))[:, 1])
+
+    def test_scorer_mode_skips_vectorizer(self):
+        """Test that the linear scorer is served without unpickling the vectorizer."""
+        from unittest import mock
+        app_module = self.app_module
+        scorer = mock.Mock(weights={"good": 1.0})
+        with mock.patch.object(app_module, "SERVING_MODE", "scorer"), \
+                mock.patch.object(app_module.LinearScorer, "load", return_value=scorer), \
+                mock.patch.object(app_module, "load_vectorizer", side_effect=AssertionError("vectorizer loaded")):
+            bundle = app_module.load_model()
+        self.assertEqual(bundle, (scorer, None, None, None))
+
+    def test_model_version_pairs_with_its_own_vectorizer(self):
+        """Test that a registry version is served with its logged vectorizer and never with a mismatched one."""
+        import pickle
+        from unittest import mock
+        import mlflow.sklearn
+        from sklearn.feature_extraction.text import CountVectorizer
+        from sklearn.linear_model import LogisticRegression
+        app_module = self.app_module
+
+        texts = ["good great film", "bad awful plot", "great plot", "awful film"]
+        trained_vectorizer = CountVectorizer().fit(texts)
+        estimator = LogisticRegression().fit(trained_vectorizer.transform(texts), [1, 0, 1, 0])
+        other_vectorizer = CountVectorizer().fit(["one two three four five six seven"])
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir, ignore_errors=True)
+        saved_model = os.path.join(work_dir, "saved_model")
+        mlflow.sklearn.save_model(estimator, saved_model)
+
+        def registry(logged_vectorizer):
+            """Stands in for download_model_version: the model plus the vectorizer logged with its run."""
+            def download(model_version, dst_dir):
+                shutil.copytree(saved_model, dst_dir, dirs_exist_ok=True)
+                if logged_vectorizer is not None:
+                    os.makedirs(os.path.join(dst_dir, "vectorizer"))
+                    with open(os.path.join(dst_dir, "vectorizer", "vectorizer.pkl"), "wb") as file:
+                        pickle.dump(logged_vectorizer, file)
+                return dst_dir
+            return download
+
+        def load(version, logged_vectorizer, **kwargs):
+            with mock.patch.object(app_module, "MODEL_CACHE_DIR", os.path.join(work_dir, "cache")), \
+                    mock.patch.object(app_module, "download_model_version", side_effect=registry(logged_vectorizer)), \
+                    mock.patch.object(app_module, "load_vectorizer", wraps=app_module.load_vectorizer) as loader:
+                return app_module.load_model(version, **kwargs), loader
+
+        bundle, _ = load("1", trained_vectorizer)
+        self.assertEqual(bundle.version, "1")
+        self.assertEqual(bundle.vectorizer.vocabulary_, trained_vectorizer.vocabulary_)
+        self.assertIs(bundle.sparse_model.__class__, LogisticRegression)
+
+        # A vectorizer of another width than the model was trained on is refused
+        bundle, _ = load("2", other_vectorizer)
+        self.assertIsInstance(bundle.model, app_module.FallbackSentimentModel)
+
+        # Without a logged vectorizer, hot reloads do not fall back to the local one
+        bundle, loader = load("3", None, allow_local_vectorizer=False)
+        self.assertIsInstance(bundle.model, app_module.FallbackSentimentModel)
+        loader.assert_not_called()
+
+        original = app_module.serving
+        try:
+            with mock.patch.object(app_module, "get_latest_model_version", return_value="2"), \
+                    mock.patch.object(app_module, "load_model", return_value=bundle):
+                self.assertFalse(app_module.reload_model_if_changed())
+            self.assertIs(app_module.serving, original)
+        finally:
+            app_module.publish(original)
+
+    def test_prediction_cache(self):
+        """Test LRU and TTL eviction of the prediction cache and its clearing on model change."""
+        app_module = self.app_module
+        cache = app_module.PredictionCache(max_entries=2, ttl_seconds=60)
+        first, second, third = (cache.key("1", text) for text in ("a", "b", "c"))
+
+        cache.put(first, (1, 0.9, "MLflow Model"))
+        cache.put(second, (0, 0.1, "MLflow Model"))
+        self.assertEqual(cache.get(first), (1, 0.9, "MLflow Model"))
+        cache.put(third, (1, 0.8, "MLflow Model"))
+        # "b" was the least recently used entry
+        self.assertIsNone(cache.get(second))
+        self.assertIsNotNone(cache.get(first))
+        self.assertNotEqual(cache.key("2", "a"), first)
+
+        cache.ttl = -1
+        cache.put(second, (0, 0.1, "MLflow Model"))
+        self.assertIsNone(cache.get(second))
+
+        original = app_module.serving
+        try:
+            app_module.prediction_cache.put(first, (1, 0.9, "MLflow Model"))
+            app_module.publish(original._replace(version="2"))
+            self.assertEqual(len(app_module.prediction_cache), 0)
+        finally:
+            app_module.publish(original)
+
+        metrics = self.client.get("/metrics").get_data(as_text=True)
+        self.assertIn("prediction_cache_hit_count_total", metrics)
+        self.assertIn('prediction_cache_eviction_count_total{reason="size"}', metrics)
+
+class TestAsyncEndpoint(unittest.TestCase):
+    """Test cases for the ASGI variant of the batch endpoint."""
+
+    @classmethod
+    def setUpClass(cls):
+        from starlette.testclient import TestClient
+        import asgi
+        cls.asgi = asgi
+        cls.client = TestClient(asgi.app)
+
+    def test_rejects_invalid_payload(self):
+        """Test that the async endpoint validates its JSON body like the Flask one."""
+        response = self.client.post("/api/v1/predict", json={"texts": []})
+        self.assertEqual(response.status_code, 400)
+
+    def test_full_queue_returns_429(self):
+        """Test that requests beyond ASYNC_MAX_PENDING are rejected instead of queued."""
+        limit = self.asgi.ASYNC_MAX_PENDING
+        self.asgi.ASYNC_MAX_PENDING = 0
+        try:
+            response = self.client.post("/api/v1/predict", json={"texts": ["good film"]})
+        finally:
+            self.asgi.ASYNC_MAX_PENDING = limit
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response.headers)
+
+    def test_form_shares_the_bounded_queue(self):
+        """Test that the /predict form goes through the same queue limit and renders the page."""
+        response = self.client.post("/predict", data={"text": "good film"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Sentiment Analysis", response.content)
+
+        limit = self.asgi.ASYNC_MAX_PENDING
+        self.asgi.ASYNC_MAX_PENDING = 0
+        try:
+            response = self.client.post("/predict", data={"text": "good film"})
+        finally:
+            self.asgi.ASYNC_MAX_PENDING = limit
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response.headers)
+
+    def test_other_routes_served_by_flask(self):
+        """Test that the remaining routes are delegated to the Flask app."""
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("app_rejected_request_count", self.client.get("/metrics").text)
+
+class TestModelCache(unittest.TestCase):
+    """Test cases for the on-disk model cache."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.downloads = []
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def download(self, size):
+        def write_model(dst_dir):
+            self.downloads.append(dst_dir)
+            with open(os.path.join(dst_dir, "model.pkl"), "wb") as file:
+                file.write(b"x" * size)
+            return dst_dir
+        return write_model
+
+    def test_cache_hit_and_checksum_validation(self):
+        """Test that an unchanged version is reused and a corrupted one is downloaded again."""
+        from model_cache import ModelCache
+        cache = ModelCache(self.cache_dir, max_bytes=10_000)
+
+        path = cache.fetch("my_model", "1", self.download(100))
+        self.assertEqual(cache.fetch("my_model", "1", self.download(100)), path)
+        self.assertEqual(len(self.downloads), 1)
+
+        with open(os.path.join(path, "model.pkl"), "wb") as file:
+            file.write(b"corrupted")
+        cache.fetch("my_model", "1", self.download(100))
+        self.assertEqual(len(self.downloads), 2)
+
+    def test_concurrent_misses_download_once(self):
+        """Test that processes missing the cache at the same time share a single download."""
+        import multiprocessing
+        if "fork" not in multiprocessing.get_all_start_methods():
+            self.skipTest("needs the fork start method")
+        from model_cache import ModelCache
+        cache = ModelCache(self.cache_dir, max_bytes=10_000)
+        marker_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, marker_dir, ignore_errors=True)
+
+        def slow_download(dst_dir):
+            # Record the download where the parent process can count it
+            tempfile.mkstemp(dir=marker_dir)
+            time.sleep(0.3)
+            with open(os.path.join(dst_dir, "model.pkl"), "wb") as file:
+                file.write(b"x" * 100)
+            return dst_dir
+
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=cache.fetch, args=("my_model", "1", slow_download)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=30)
+            self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(len(os.listdir(marker_dir)), 1)
+        self.assertIsNotNone(cache.get("my_model", "1"))
+
+    def test_download_to_another_directory_is_rejected(self):
+        """Test that a download callable reporting a different directory is not cached."""
+        from model_cache import ModelCache
+        cache = ModelCache(self.cache_dir, max_bytes=10_000)
+        with self.assertRaises(RuntimeError):
+            cache.fetch("my_model", "1", lambda dst_dir: self.cache_dir)
+        self.assertIsNone(cache.get("my_model", "1"))
+
+    def test_eviction_keeps_cache_within_size(self):
+        """Test that the least recently used versions are evicted first."""
+        from model_cache import ModelCache
+        cache = ModelCache(self.cache_dir, max_bytes=250)
+
+        for version in ("1", "2", "3"):
+            cache.fetch("my_model", version, self.download(100))
+            time.sleep(0.01)
+
+        self.assertIsNone(cache.get("my_model", "1"))
+        self.assertIsNotNone(cache.get("my_model", "2"))
+        self.assertIsNotNone(cache.get("my_model", "3"))
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """Test cases for the /predict micro-batcher."""
+
+    def test_concurrent_requests_are_coalesced(self):
+        """Test that concurrent submits share batches and each get their own result."""
+        from concurrent.futures import ThreadPoolExecutor
+        from batcher import MicroBatcher
+
+        batch_sizes = []
+
+        def double(items):
+            batch_sizes.append(len(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(double, max_wait_ms=50, max_batch=8)
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(batcher.submit, range(16)))
+
+        self.assertEqual(results, [item * 2 for item in range(16)])
+        self.assertEqual(sum(batch_sizes), 16)
+        self.assertLess(len(batch_sizes), 16)
+        self.assertLessEqual(max(batch_sizes), 8)
+
+    def test_batch_errors_reach_every_request(self):
+        """Test that an exception in the batch function is raised in the waiting request."""
+        from batcher import MicroBatcher
+
+        def fail(items):
+            raise ValueError("model failed")
+
+        batcher = MicroBatcher(fail, max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            batcher.submit("text")
+
 if __name__ == '__main__':
     unittest.main()